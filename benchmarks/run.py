@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+# Benchmark suite for covimath.
+#
+# Run from the top-level covimath directory:
+#   python3 benchmarks/run.py --save-baseline   (record a baseline)
+#   python3 benchmarks/run.py                   (compare against it)
+# Each benchmark reports the best time per call over several repeats.
+# Results are written as JSON; when a baseline exists, the run fails
+# (exit status 1) if any benchmark is slower than the baseline by more than
+# the tolerance.
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import timeit
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+
+from covimath.models import sir, seir, seird, sis
+from covimath.models.batch import solve_batch
+from covimath.paramest import sirparams
+from covimath.sensitivity import sobol
+from covimath.emulator import lookup
+from covimath.emulator.surrogate import Emulator
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, 'baseline.json')
+
+# Parameter regimes: (multiplier of the default beta, label)
+REGIMES = [(1.0, 'fast'), (0.4, 'slow')]
+HORIZONS = [150, 365]
+
+# name -> (setup, stmt): setup() returns the state passed to stmt(state)
+BENCHMARKS = {}
+
+def add(name, setup, stmt):
+    BENCHMARKS[name] = (setup, stmt)
+
+def _sir(scale, tau):
+    return lambda: sir.SIR(N=2000, beta=0.4 * scale, gamma=0.1, I0=1, R0=0,
+                           tau=tau)
+
+def _seir(scale, tau):
+    return lambda: seir.SEIR(N=1000, beta=1.38 * scale, sigma=0.19,
+                             gamma=0.34, E0=1, I0=1, R0=0, tau=tau)
+
+def _seird(scale, tau):
+    return lambda: seird.SEIRD(N=1000, beta=1.38 * scale, sigma=0.19,
+                               gamma=0.34, mu=0.03, E0=1, I0=1, R0=0, D0=0,
+                               tau=tau)
+
+def _solved(make):
+    def setup():
+        model = make()
+        model.solve()
+        return model
+    return setup
+
+for _scale, _label in REGIMES:
+    for _tau in HORIZONS:
+        for _name, _make in (('sir', _sir), ('seir', _seir),
+                             ('seird', _seird)):
+            add('%s.solve[%s,tau=%d]' % (_name, _label, _tau),
+                _make(_scale, _tau), lambda model: model.solve())
+
+add('sir.peak', _solved(_sir(1.0, 150)), lambda model: model.peak())
+add('seird.peak', _solved(_seird(1.0, 150)),
+    lambda model: model.peak())
+
+def _plot(model):
+    model.plot()
+    plt.close('all')
+
+add('seird.plot', _solved(_seird(1.0, 150)), _plot)
+
+add('sir.final_size[1000]',
+    lambda: np.linspace(0.05, 0.5, 1000),
+    lambda beta: sir.final_size(2000, beta, 0.1, 1, 0))
+add('sir.peak_time[1000]',
+    lambda: np.linspace(0.05, 0.5, 1000),
+    lambda beta: sir.peak_time(2000, beta, 0.1, 1, 0))
+
+def _sis_setup():
+    return sis.SIS(N=1000, lam=0.05, mu=0.15, gamma=0.1, I0=1, tau=150)
+
+add('sis.i[150]', _sis_setup,
+    lambda model: [model.i(t) for t in range(model.tau)])
+
+add('sirparams.findbeta',
+    lambda: np.array([5, 7, 11, 20, 30, 45, 75, 115, 155,
+                      220, 315, 540, 720, 950]), sirparams.findbeta)
+
+def _batch_setup():
+    n = 256
+    beta = np.linspace(0.8, 1.8, n)
+    y0 = np.array([[998.0] * n, [1.0] * n, [1.0] * n, [0.0] * n, [0.0] * n])
+    return beta, y0, np.linspace(0, 150, 150)
+
+add('batch.seird[256]', _batch_setup,
+    lambda s: solve_batch(seird.diffeqns, s[1], s[2],
+                          [1000, s[0], 0.19, 0.34, 0.03]))
+
+SOBOL_BOUNDS = {'beta': (1.0, 1.8), 'sigma': (0.1, 0.3),
+                'gamma': (0.2, 0.5), 'mu': (0.01, 0.05)}
+SOBOL_FIXED = {'N': 1000, 'E0': 1, 'I0': 1, 'R0': 0, 'D0': 0}
+
+add('sobol.analyze[seird,n=128]', lambda: None,
+    lambda s: sobol.analyze('SEIRD', SOBOL_BOUNDS, SOBOL_FIXED, 150, n=128,
+                            seed=1))
+
+def _emulator_setup():
+    emu = Emulator('SEIRD', SOBOL_BOUNDS, SOBOL_FIXED, 150)
+    emu.train(n=128, seed=1)
+    return emu
+
+add('emulator.predict', _emulator_setup,
+    lambda emu: emu.predict(beta=1.38, sigma=0.19, gamma=0.34, mu=0.03))
+
+def _lookup_setup():
+    return lookup.build_table(ratio=np.linspace(3.5, 4.5, 6),
+                              sigma=np.linspace(0.4, 0.7, 4),
+                              mu=np.linspace(0.0, 0.15, 4), horizon=100.0)
+
+add('lookup.lookup[1000]', _lookup_setup,
+    lambda table: table.lookup(1000, 1, 1, np.linspace(1.3, 1.5, 1000),
+                               0.19, 0.34, 0.03))
+
+# Median time per call (seconds) of stmt(state), over repeat runs of number
+# calls each. number is chosen so that a run takes about min_time.
+def measure(setup, stmt, repeat=15, min_time=0.2):
+    state = setup()
+    timer = timeit.Timer(lambda: stmt(state))
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    times = timer.repeat(repeat=repeat, number=number)
+    return float(np.median(times)) / number
+
+# Names of benchmarks slower than baseline by more than tolerance. Timings
+# drift with the load of the machine, so a benchmark over the tolerance is
+# measured again (up to retries times, keeping its best time) and is a
+# regression only if it stays over.
+def compare(results, baseline, tolerance, retries=2, repeat=15):
+    slower = []
+    for name, sec in sorted(results.items()):
+        if name not in baseline:
+            continue
+        limit = baseline[name] * (1 + tolerance)
+        for _ in range(retries):
+            if sec <= limit:
+                break
+            sec = min(sec, measure(*BENCHMARKS[name], repeat=repeat))
+        ratio = sec / baseline[name]
+        flag = ''
+        if sec > limit:
+            slower.append(name)
+            flag = '  REGRESSION'
+        print('%-36s %10.3e s  %6.2fx baseline%s' % (name, sec, ratio, flag))
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description='Run covimath benchmarks.')
+    parser.add_argument('-k', dest='filter', default='',
+                        help='only run benchmarks whose name contains this')
+    parser.add_argument('--output', default=os.path.join(HERE,
+                        'results.json'), help='JSON file for the results')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='JSON file of baseline results')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown relative to the baseline')
+    parser.add_argument('--retries', type=int, default=2,
+                        help='measurements to confirm a slowdown')
+    parser.add_argument('--repeat', type=int, default=15)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = {}
+    for name, (setup, stmt) in BENCHMARKS.items():
+        if args.filter in name:
+            results[name] = measure(setup, stmt, repeat=args.repeat)
+            print('%-36s %10.3e s' % (name, results[name]))
+
+    report = {'python': platform.python_version(),
+              'numpy': np.__version__, 'machine': platform.machine(),
+              'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print('Baseline saved to ' + args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('No baseline at ' + args.baseline +
+              '; run with --save-baseline to create one.')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    print('\nComparison with ' + args.baseline + ':')
+    slower = compare(results, baseline, args.tolerance, args.retries,
+                     args.repeat)
+    if len(slower) > 0:
+        print('\nPerformance regressions: ' + ', '.join(slower))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
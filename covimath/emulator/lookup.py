@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+import json
+import numpy as np
+import logging
+
+from ..models import seird
+from ..models.batch import solve_batch, CHUNK
+
+logging.basicConfig(level = logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Quantities stored in a table, per grid point
+FIELDS = ('peak_time', 'peak_height', 'final_R', 'final_D')
+
+# Default grid: beta/gamma, sigma/gamma and mu/gamma
+RATIO = np.linspace(0.5, 8.0, 31)
+SIGMA = np.geomspace(0.1, 5.0, 25)
+MU = np.linspace(0.0, 0.5, 11)
+
+# Precomputed SEIRD outputs on a grid of normalized parameters.
+# The SEIRD equations are invariant when all compartments are divided by N
+# and time is measured in units of 1 / gamma, so the outputs only depend on
+# beta/gamma, sigma/gamma, mu/gamma and the initial fractions e0 = E0/N and
+# i0 = I0/N (R0 = D0 = 0), which are fixed when the table is built.
+# SEIR corresponds to mu = 0.
+# Stored values (fractions of N, and time in units of 1 / gamma):
+#   peak_time, peak_height: the peak of the infected curve
+#   final_R, final_D: recovered and dead at the end of the horizon
+class LookupTable:
+
+    def __init__(self, axes, values, e0, i0, horizon):
+        self.axes = [np.asarray(a, dtype=float) for a in axes]
+        self.values = values # shape (len(ratio), len(sigma), len(mu), 4)
+        self.e0 = e0 # Initial exposed fraction
+        self.i0 = i0 # Initial infected fraction
+        self.horizon = horizon # Time window in units of 1 / gamma
+
+    # Write the table to path.npy (values as float32, memory-mappable) and
+    # path.json (axes and metadata)
+    def save(self, path):
+        logger.info('Saving lookup table to ' + path + '.npy ...')
+        np.save(path + '.npy', np.asarray(self.values, dtype=np.float32))
+        meta = {'axes': [a.tolist() for a in self.axes],
+                'fields': list(FIELDS), 'e0': self.e0, 'i0': self.i0,
+                'horizon': self.horizon}
+        with open(path + '.json', 'w') as f:
+            json.dump(meta, f)
+
+    # Multilinear interpolation of the table at normalized parameters
+    # (arrays of equal shape). Returns an array of shape (..., 4).
+    def interpolate(self, ratio, sigma, mu):
+        pts = np.broadcast_arrays(*[np.asarray(x, dtype=float)
+                                    for x in (ratio, sigma, mu)])
+        idx = []
+        wts = []
+        for name, ax, x in zip(('beta/gamma', 'sigma/gamma', 'mu/gamma'),
+                               self.axes, pts):
+            if np.any(x < ax[0]) or np.any(x > ax[-1]):
+                raise ValueError('Value of ' + name + ' outside the table: ' +
+                                 str(ax[0]) + ' to ' + str(ax[-1]))
+            i = np.clip(np.searchsorted(ax, x, side='right') - 1, 0,
+                        len(ax) - 2)
+            idx.append(i)
+            wts.append((x - ax[i]) / (ax[i + 1] - ax[i]))
+
+        res = 0.0
+        for b0 in (0, 1):
+            for b1 in (0, 1):
+                for b2 in (0, 1):
+                    w = ((wts[0] if b0 else 1 - wts[0]) *
+                         (wts[1] if b1 else 1 - wts[1]) *
+                         (wts[2] if b2 else 1 - wts[2]))
+                    v = self.values[idx[0] + b0, idx[1] + b1, idx[2] + b2]
+                    res = res + w[..., np.newaxis] * v
+        return res
+
+    # Peak (day, number infected) and final number recovered and dead for
+    # a SEIRD model, without solving it. Arguments may be numpy arrays.
+    # E0/N and I0/N must be the initial fractions of the table (the outputs
+    # depend on them, e.g. the peak comes later for smaller fractions).
+    def lookup(self, N, E0, I0, beta, sigma, gamma, mu=0.0):
+        N, E0, I0, beta, sigma, gamma, mu = np.broadcast_arrays(*[
+            np.asarray(a, dtype=float)
+            for a in (N, E0, I0, beta, sigma, gamma, mu)])
+        for name, x, frac in (('E0', E0, self.e0), ('I0', I0, self.i0)):
+            if not np.allclose(x / N, frac, rtol=1e-6, atol=0.0):
+                raise ValueError(name + '/N does not match the table (' +
+                                 str(frac) + '); build a table with these '
+                                 'initial fractions')
+        v = self.interpolate(beta / gamma, sigma / gamma, mu / gamma)
+        return {'peak_day': v[..., 0] / gamma,
+                'peak_height': v[..., 1] * N,
+                'final_R': v[..., 2] * N,
+                'final_D': v[..., 3] * N}
+
+# Load a table written by LookupTable.save(). The values are memory-mapped,
+# so processes loading the same file share its pages.
+def load_table(path):
+    with open(path + '.json') as f:
+        meta = json.load(f)
+    values = np.load(path + '.npy', mmap_mode='r')
+    return LookupTable(meta['axes'], values, meta['e0'], meta['i0'],
+                       meta['horizon'])
+
+# Build a table by solving the normalized SEIRD model at every grid point.
+# step: time resolution (units of 1 / gamma); the peak time is refined by
+# parabolic interpolation between grid times.
+def build_table(ratio=RATIO, sigma=SIGMA, mu=MU, e0=1e-3, i0=1e-3,
+                horizon=200.0, step=0.1, chunk=CHUNK, workers=1):
+    axes = [np.asarray(a, dtype=float) for a in (ratio, sigma, mu)]
+    grid = np.meshgrid(*axes, indexing='ij')
+    P = np.stack([g.reshape(-1) for g in grid], axis=1)
+    n = P.shape[0]
+    logger.info('Building lookup table with %d grid points ...', n)
+
+    t = np.linspace(0, horizon, int(round(horizon / step)) + 1)
+    dt = t[1] - t[0]
+    values = np.empty((n, len(FIELDS)))
+    group = chunk * max(workers, 1) * 4
+    for lo in range(0, n, group):
+        hi = min(lo + group, n)
+        m = hi - lo
+        y0 = np.array([[1 - e0 - i0] * m, [e0] * m, [i0] * m, [0] * m,
+                       [0] * m])
+        y = solve_batch(seird.diffeqns, y0, t,
+                        [1.0, P[lo:hi, 0], P[lo:hi, 1], 1.0, P[lo:hi, 2]],
+                        chunk=chunk, workers=workers)
+        I = y[2]
+        k = np.clip(np.argmax(I, axis=1), 1, len(t) - 2)
+        rows = np.arange(m)
+        a, b, c = I[rows, k - 1], I[rows, k], I[rows, k + 1]
+        den = a - 2 * b + c
+        shift = np.where(den < 0, 0.5 * (a - c) / np.where(den < 0, den, 1),
+                         0.0)
+        peak = np.argmax(I, axis=1)
+        inner = (peak > 0) & (peak < len(t) - 1)
+        values[lo:hi, 0] = np.where(inner, t[k] + shift * dt, t[peak])
+        values[lo:hi, 1] = np.where(inner, b - 0.25 * (a - c) * shift,
+                                    I[rows, peak])
+        values[lo:hi, 2] = y[3, :, -1]
+        values[lo:hi, 3] = y[4, :, -1]
+
+    values = values.reshape(grid[0].shape + (len(FIELDS),))
+    return LookupTable(axes, values, e0, i0, horizon)
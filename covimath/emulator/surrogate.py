@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+import itertools
+import numpy as np
+from numpy.polynomial.legendre import legvander
+from scipy.stats import qmc
+import logging
+
+from ..models.batch import solve_model, get_spec, OUTPUTS, CHUNK
+from ..utils import rng
+
+logging.basicConfig(level = logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Polynomial chaos emulator of a model over a box of parameter values.
+# Scalar outputs (peak day, peak height, final sizes) are fitted with a
+# total-degree Legendre expansion. Trajectories are compressed onto a
+# reduced basis (leading singular vectors of the training trajectories) and
+# the basis coefficients are fitted with the same expansion.
+# Queries outside the box fall back to solving the real model.
+class Emulator:
+
+    def __init__(self, model, bounds, fixed, tau, degree=3, nbasis=8):
+        spec = get_spec(model)
+        logger.info('Initializing emulator of %s model ...', spec.name)
+        comps = spec.compartments
+        self.model = model
+        self.bounds = dict(bounds) # Parameter name -> (low, high)
+        self.names = list(bounds)
+        self.fixed = dict(fixed) # N, initial values and rates not emulated
+        self.tau = tau # Time window in days over which to model
+        self.degree = degree # Total degree of the polynomial expansion
+        self.nbasis = nbasis # Number of reduced basis vectors per compartment
+        self.outputs = [o for o in OUTPUTS if not o.startswith('final_')
+                        or o[len('final_'):] in comps]
+        self.comps = comps
+        self.lo = np.array([bounds[p][0] for p in self.names], dtype=float)
+        self.hi = np.array([bounds[p][1] for p in self.names], dtype=float)
+        self.alphas = [a for a in itertools.product(range(degree + 1),
+                                                    repeat=len(self.names))
+                       if sum(a) <= degree]
+        self.t = np.linspace(0, tau, tau)
+        self.coef = None
+        self.seed = None # Seed of the training sample
+
+    # Legendre design matrix at parameter values X, shape (m, d)
+    def _design(self, X):
+        Z = 2 * (X - self.lo) / (self.hi - self.lo) - 1
+        V = [legvander(Z[:, j], self.degree) for j in range(Z.shape[1])]
+        return np.stack([np.prod([V[j][:, a[j]] for j in range(len(a))],
+                                 axis=0) for a in self.alphas], axis=1)
+
+    # Least squares fit of all columns of F, with leave-one-out residuals
+    def _fit(self, Phi, F):
+        G = np.linalg.pinv(Phi.T @ Phi)
+        coef = G @ Phi.T @ F
+        h = np.einsum('ij,jk,ik->i', Phi, G, Phi)
+        loo = (F - Phi @ coef) / (1 - np.minimum(h, 1 - 1e-9))[:, np.newaxis]
+        return coef, G, loo
+
+    # Sample the parameter box, solve the model in batch and fit the
+    # expansions. n must exceed the number of polynomial terms.
+    # seed: see covimath.utils.rng; the seed used is kept in self.seed.
+    def train(self, n=512, seed=None, chunk=CHUNK, workers=1):
+        if n <= len(self.alphas):
+            raise ValueError('Need more than ' + str(len(self.alphas)) +
+                             ' training samples')
+        logger.info('Training emulator on %d samples ...', n)
+        seed = rng.seed_sequence(seed)
+        self.seed = rng.describe(seed)
+        X = qmc.scale(qmc.Sobol(d=len(self.names), scramble=True,
+                                seed=rng.generator(seed)).random(n),
+                      self.lo, self.hi)
+        t, y, comps = self._solve(X, chunk=chunk, workers=workers)
+        Phi = self._design(X)
+
+        # Scalar outputs
+        F = np.stack([OUTPUTS[o](y, t, comps) for o in self.outputs], axis=1)
+        coef, G, loo = self._fit(Phi, F)
+        self.G = G
+        self.coef = {o: coef[:, k] for k, o in enumerate(self.outputs)}
+        self.rmse = {o: np.sqrt(np.mean(loo[:, k] ** 2))
+                     for k, o in enumerate(self.outputs)}
+
+        # Reduced basis trajectories
+        self.mean = {}
+        self.basis = {}
+        self.bcoef = {}
+        for k, c in enumerate(comps):
+            Y = y[k]
+            mean = Y.mean(axis=0)
+            U, s, Vt = np.linalg.svd(Y - mean, full_matrices=False)
+            basis = Vt[:self.nbasis]
+            proj = (Y - mean) @ basis.T
+            bcoef, _, bloo = self._fit(Phi, proj)
+            trunc = np.sum(s[self.nbasis:] ** 2) / n
+            self.mean[c] = mean
+            self.basis[c] = basis
+            self.bcoef[c] = bcoef
+            self.rmse[c] = np.sqrt((np.mean(np.sum(bloo ** 2, axis=1)) +
+                                    trunc) / len(t))
+
+        self.X = X
+
+    # Solve the real model at parameter values X, shape (m, d)
+    def _solve(self, X, chunk=CHUNK, workers=1):
+        values = dict(self.fixed)
+        for j, p in enumerate(self.names):
+            values[p] = X[:, j]
+        return solve_model(self.model, values, X.shape[0], self.tau,
+                           chunk=chunk, workers=workers)
+
+    # Parameter values of a query as an (m, d) array, and the mask of rows
+    # inside the training box
+    def _query(self, params):
+        miss = [p for p in self.names if p not in params]
+        if len(miss) > 0:
+            raise ValueError('Some required parameters are missing: ' +
+                             ','.join(miss))
+        X = np.stack(np.broadcast_arrays(*[np.atleast_1d(
+            np.asarray(params[p], dtype=float)) for p in self.names]), axis=1)
+        inside = np.all((X >= self.lo) & (X <= self.hi), axis=1)
+        return X, inside
+
+    # Predict the scalar outputs at the given parameter values (scalars or
+    # arrays). Returns two dicts of output name -> array: the predictions
+    # and their error estimates (one standard error, from leave-one-out
+    # residuals; zero for queries answered by the real solver).
+    def predict(self, **params):
+        if self.coef is None:
+            logger.error('train() method has not been invoked yet')
+            raise ValueError("predict() method invoked before invoking train()")
+
+        X, inside = self._query(params)
+        Phi = self._design(X)
+        scale = np.sqrt(1 + np.einsum('ij,jk,ik->i', Phi, self.G, Phi))
+        values = {o: Phi @ self.coef[o] for o in self.outputs}
+        errors = {o: self.rmse[o] * scale for o in self.outputs}
+
+        if not np.all(inside):
+            logger.info('%d queries outside the trained domain, solving ...',
+                        np.sum(~inside))
+            t, y, comps = self._solve(X[~inside])
+            for o in self.outputs:
+                values[o][~inside] = OUTPUTS[o](y, t, comps)
+                errors[o][~inside] = 0.0
+
+        return values, errors
+
+    # Predict the trajectories of all compartments. Returns two dicts of
+    # compartment -> array: the trajectories, shape (m, len(t)), and their
+    # RMS error estimates, shape (m,).
+    def trajectories(self, **params):
+        if self.coef is None:
+            logger.error('train() method has not been invoked yet')
+            raise ValueError("trajectories() method invoked before invoking train()")
+
+        X, inside = self._query(params)
+        Phi = self._design(X)
+        scale = np.sqrt(1 + np.einsum('ij,jk,ik->i', Phi, self.G, Phi))
+        values = {c: self.mean[c] + (Phi @ self.bcoef[c]) @ self.basis[c]
+                  for c in self.comps}
+        errors = {c: self.rmse[c] * scale for c in self.comps}
+
+        if not np.all(inside):
+            logger.info('%d queries outside the trained domain, solving ...',
+                        np.sum(~inside))
+            t, y, comps = self._solve(X[~inside])
+            for k, c in enumerate(comps):
+                values[c][~inside] = y[k]
+                errors[c][~inside] = 0.0
+
+        return values, errors
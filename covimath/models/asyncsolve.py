@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+import logging
+
+from ..utils import instrument
+
+logging.basicConfig(level = logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Solve a model in a worker thread/process and return it
+def _solve(model, method, notify):
+    model.solve(method=method, notify=notify)
+    return model
+
+# Solve n instances of a model in a worker (see batch.solve_model). Without
+# notify, the chunk SolveStats are always returned, for _finish().
+def _solve_batch(model, values, n, tau, kwargs, notify):
+    from .batch import solve_model
+    if not notify:
+        kwargs = dict(kwargs, return_stats=True)
+    return solve_model(model, values, n, tau, notify=notify, **kwargs)
+
+# Hooks of worker processes are not those of this process: workers solve
+# with notify False and the statistics are reported here, as in
+# batch.solve_batch(). Returns the result the caller asked for.
+def _finish(fn, args, res):
+    if fn is _solve:
+        instrument.report(res.stats)
+        return res
+    for st in res[3]:
+        instrument.report(st)
+    return res if args[4].get('return_stats') else res[:3]
+
+# Key identifying identical solve requests
+def _key(model, method):
+    spec = model.SPEC
+    values = ((model.N, model.tau, model.t) +
+              tuple(getattr(model, p) for p in spec.params) +
+              tuple(getattr(model, c + '0') for c in spec.compartments))
+    return (spec.name, method) + tuple(np.asarray(v, dtype=float).tobytes()
+                                       for v in values)
+
+# Set on a shared request whose creator was cancelled before queueing it;
+# callers that joined the request submit it again
+class _Abandoned(Exception):
+    pass
+
+# Copy the solution of model source into model target
+def _adopt(target, source):
+    if target is source:
+        return
+    for c in target.SPEC.compartments:
+        setattr(target, c, getattr(source, c))
+    target.stats = source.stats
+
+# Solves models without blocking the event loop. Integration runs in a
+# thread pool (or a process pool if processes is True, which avoids
+# contention on the GIL but copies models to and from the workers).
+# - Concurrent requests for identical models are coalesced into one solve.
+# - At most max_queue requests wait for a worker; further submissions wait
+#   until there is room (backpressure).
+# A solver serves one event loop at a time; used from a new event loop, it
+# restarts its workers there.
+class AsyncSolver:
+
+    def __init__(self, max_workers=4, max_queue=64, processes=False):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.processes = processes
+        self._executor = None
+        self._queue = None
+        self._loop = None
+        self._tasks = []
+        self._inflight = {} # Request key -> future of the shared solve
+
+    def _start(self):
+        loop = asyncio.get_event_loop()
+        if self._queue is not None and self._loop is loop:
+            return
+        if self._executor is not None:
+            # Previous event loop has gone away with its worker tasks
+            self._executor.shutdown(wait=False)
+            self._queue = None
+            self._cancel_pending()
+        self._loop = loop
+        logger.info('Starting async solver with %d workers ...',
+                    self.max_workers)
+        if self.processes:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.ensure_future(self._work())
+                       for _ in range(self.max_workers)]
+
+    # Cancel the futures of requests not yet answered (queued, or shared by
+    # coalesced callers) and forget them
+    def _cancel_pending(self):
+        futs = list(self._inflight.values())
+        while self._queue is not None and not self._queue.empty():
+            futs.append(self._queue.get_nowait()[3])
+        for fut in futs:
+            try:
+                fut.cancel()
+            except RuntimeError:
+                pass # Event loop of fut is closed
+        self._inflight = {}
+
+    async def _work(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            key, fn, args, fut = await self._queue.get()
+            try:
+                res = await loop.run_in_executor(self._executor, fn, *args)
+                if self.processes:
+                    res = _finish(fn, args, res)
+            except asyncio.CancelledError:
+                fut.cancel()
+                raise
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+            else:
+                if not fut.done():
+                    fut.set_result(res)
+            finally:
+                if key is not None:
+                    self._inflight.pop(key, None)
+                self._queue.task_done()
+
+    async def _enqueue(self, key, fn, *args):
+        self._start()
+        fut = asyncio.get_event_loop().create_future()
+        if key is not None:
+            self._inflight[key] = fut
+        try:
+            await self._queue.put((key, fn, args, fut))
+        except BaseException:
+            if key is not None:
+                self._inflight.pop(key, None)
+            fut.set_exception(_Abandoned())
+            fut.exception() # Not an error if nobody joined the request
+            raise
+        return fut
+
+    # Solve model (an instance of a CompartmentModel subclass, e.g. SEIRD)
+    # and return it, with its compartments set as after model.solve().
+    async def submit(self, model, method='RK45'):
+        self._start() # Before the lookup: may drop requests of an old loop
+        key = _key(model, method)
+        while True:
+            fut = self._inflight.get(key)
+            if fut is None:
+                fut = await self._enqueue(key, _solve, model, method,
+                                          not self.processes)
+            else:
+                logger.debug('Coalescing request for %s model',
+                             model.SPEC.name)
+            try:
+                solved = await asyncio.shield(fut)
+                break
+            except _Abandoned:
+                continue
+        _adopt(model, solved)
+        return model
+
+    # Solve several models concurrently
+    async def map(self, models, method='RK45'):
+        return await asyncio.gather(*[self.submit(m, method=method)
+                                      for m in models])
+
+    # Solve n instances of a model in one batch (see batch.solve_model);
+    # kwargs are passed on, e.g. chunk or return_stats.
+    async def solve_batch(self, model, values, n, tau, **kwargs):
+        fut = await self._enqueue(None, _solve_batch, model, values, n, tau,
+                                  kwargs, not self.processes)
+        return await asyncio.shield(fut)
+
+    # Stop the workers and release the pool
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._cancel_pending()
+        self._queue = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+# Solver used by CompartmentModel.asolve() when none is given
+_default = None
+
+def default_solver():
+    global _default
+    if _default is None:
+        _default = AsyncSolver()
+    return _default
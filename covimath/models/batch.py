@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from scipy.sparse import csc_matrix
+from concurrent.futures import ProcessPoolExecutor
+import logging
+
+from . import sir, seir, seird
+from ..utils import instrument
+
+logging.basicConfig(level = logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default number of model instances integrated together as one ODE system
+CHUNK = 64
+
+# Model name -> ModelSpec (see builder.py)
+MODELS = {
+    'SIR': sir.SPEC,
+    'SEIR': seir.SPEC,
+    'SEIRD': seird.SPEC,
+}
+
+# ModelSpec of a model given by name (a key of MODELS) or by its ModelSpec
+def get_spec(model):
+    if isinstance(model, str):
+        if model not in MODELS:
+            raise ValueError('Unknown model: ' + str(model))
+        return MODELS[model]
+    return model
+
+# Scalar outputs of a batch of trajectories y, of shape (ncomp, n, len(t))
+def _peak_day(y, t, comps):
+    return t[np.argmax(y[comps.index('I')], axis=1)]
+
+def _peak_height(y, t, comps):
+    return np.max(y[comps.index('I')], axis=1)
+
+def _final(name):
+    def output(y, t, comps):
+        return y[comps.index(name), :, -1]
+    return output
+
+OUTPUTS = {
+    'peak_day': _peak_day,
+    'peak_height': _peak_height,
+    'final_R': _final('R'),
+    'final_D': _final('D'),
+}
+
+# Solve one chunk of model instances as a single stacked ODE system.
+# y0 has shape (ncomp, n) and each entry of args has shape (n,).
+# If jac is given, the Jacobian of the stacked system is block diagonal
+# (sparse); LSODA does not take sparse Jacobians and estimates its own.
+# Returns the trajectories (passed through transform, if given) and the
+# SolveStats of the chunk.
+def _solve_chunk(deriv, y0, t, args, method, label, jac, transform):
+    k, n = y0.shape
+
+    def fun(tt, y):
+        return np.asarray(deriv(tt, y.reshape(k, n), *args)).reshape(-1)
+
+    kwargs = {}
+    if jac is not None and method in ('Radau', 'BDF'):
+        # Entry (i, j) of instance m is at row i * n + m, column j * n + m
+        rows = np.arange(k)[:, np.newaxis, np.newaxis] * n + np.arange(n)
+        cols = np.arange(k)[np.newaxis, :, np.newaxis] * n + np.arange(n)
+        rows, cols = np.broadcast_arrays(rows, cols)
+        rows = rows.reshape(-1)
+        cols = cols.reshape(-1)
+
+        def stacked_jac(tt, y):
+            J = np.broadcast_to(jac(tt, y.reshape(k, n), *args), (k, k, n))
+            return csc_matrix((J.reshape(-1), (rows, cols)),
+                              shape=(k * n, k * n))
+        kwargs['jac'] = stacked_jac
+
+    tspan = [t[0], t[-1]]
+    sol, stats = instrument.solve(fun, tspan, y0.reshape(-1), t_eval = t,
+                                  method = method, size = n,
+                                  label = label,
+                                  notify = False, **kwargs)
+    y = sol.y.reshape(k, n, -1)
+    if transform is not None:
+        y = transform(y)
+    return y, stats
+
+# Solve many instances of a model at once.
+# deriv: right hand side, e.g. covimath.models.seird.diffeqns, which must
+#   work elementwise on a (ncomp, n) array of states.
+# jac: optional Jacobian of deriv, returning shape (ncomp, ncomp, n), used
+#   by the implicit methods 'Radau' and 'BDF'.
+# y0: initial values, shape (ncomp, n).
+# t: time points at which the solution is reported.
+# args: extra arguments of deriv, each a scalar or an array of shape (n,).
+# chunk: number of instances stacked into one ODE system. The solver step
+#   is shared within a chunk, so results depend on chunk but never on the
+#   number of workers.
+# workers: number of processes over which the chunks are distributed.
+# transform: optional function applied to the trajectories of each chunk
+#   (shape (ncomp, chunk, len(t))) as soon as it is solved, e.g. to store
+#   them compactly (see covimath.utils.storage).
+# notify: pass the chunk SolveStats to the instrument hooks (in this
+#   process); False when the caller reports them itself.
+# Returns an array of shape (ncomp, n, len(t)), and if return_stats is True
+# also the list of SolveStats of the chunks (see instrument.aggregate()).
+def solve_batch(deriv, y0, t, args, chunk=CHUNK, workers=1, method='RK45',
+                return_stats=False, label=None, jac=None, transform=None,
+                notify=True):
+    y0 = np.asarray(y0, dtype=float)
+    k, n = y0.shape
+    t = np.asarray(t, dtype=float)
+    args = [np.broadcast_to(np.asarray(a, dtype=float), (n,)) for a in args]
+
+    bounds = [(lo, min(lo + chunk, n)) for lo in range(0, n, chunk)]
+    jobs = [(deriv, y0[:, lo:hi], t, [a[lo:hi] for a in args], method,
+             label, jac, transform)
+            for lo, hi in bounds]
+
+    logger.debug('Solving %d instances in %d chunks', n, len(jobs))
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_solve_chunk, *zip(*jobs)))
+    else:
+        parts = [_solve_chunk(*job) for job in jobs]
+
+    stats = [p[1] for p in parts]
+    if notify:
+        for st in stats:
+            instrument.report(st)
+    y = np.concatenate([p[0] for p in parts], axis=1)
+    if return_stats:
+        return y, stats
+    return y
+
+# Solve n instances of a model, given by name (a key of MODELS) or by its
+# ModelSpec. See ModelSpec.solve_batch().
+def solve_model(model, values, n, tau, chunk=CHUNK, workers=1,
+                method='RK45', return_stats=False, transform=None,
+                notify=True):
+    return get_spec(model).solve_batch(values, n, tau, chunk=chunk,
+                                       workers=workers, method=method,
+                                       return_stats=return_stats,
+                                       transform=transform, notify=notify)
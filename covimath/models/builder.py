@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+
+import keyword
+import numpy as np
+from scipy.signal import find_peaks
+import matplotlib.pyplot as plt
+import logging
+
+from . import asyncsolve
+from ..utils import instrument
+
+logging.basicConfig(level = logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Solver methods that use the Jacobian
+IMPLICIT = ('Radau', 'BDF', 'LSODA')
+
+# Names used by the generated code, unavailable for compartments/parameters
+RESERVED = ('t', 'y', 'N', 'J', 'np')
+
+# Movement of people from compartment source to compartment target, at the
+# mass action rate param * (product of factors) / N ** (len(factors) - 1).
+# factors defaults to (source,), i.e. a per capita rate such as sigma * E.
+# Transmission S -> I is Flow('S', 'I', 'beta', ('S', 'I')): beta * S * I / N
+class Flow:
+
+    def __init__(self, source, target, param, factors=None):
+        self.source = source
+        self.target = target
+        self.param = param
+        self.factors = tuple(factors) if factors is not None else (source,)
+
+    # Source code of the rate expression
+    def expr(self):
+        res = ' * '.join((self.param,) + self.factors)
+        return res + _divisor(len(self.factors) - 1)
+
+    # Source code of the derivative of the rate with respect to compartment
+    # c, or None if the rate does not depend on c
+    def dexpr(self, c):
+        count = self.factors.count(c)
+        if count == 0:
+            return None
+        rest = list(self.factors)
+        rest.remove(c)
+        parts = [self.param] + ([str(count)] if count > 1 else []) + rest
+        return ' * '.join(parts) + _divisor(len(self.factors) - 1)
+
+    def __repr__(self):
+        return ('Flow(' + repr(self.source) + ', ' + repr(self.target) +
+                ', ' + repr(self.param) + ', ' + repr(self.factors) + ')')
+
+def _divisor(power):
+    if power == 0:
+        return ''
+    if power == 1:
+        return ' / N'
+    return ' / N ** ' + str(power)
+
+# Declarative compartment model: compartments and flows between them are
+# compiled into Python functions for the right hand side (deriv) and the
+# Jacobian (jac). Both are written with elementwise operations, so that y
+# may hold a batch of states (shape (ncomp, n)) with array-valued
+# parameters. The first compartment holds everyone not in the others
+# initially (its initial value is N minus the rest).
+class ModelSpec:
+
+    def __init__(self, name, compartments, flows):
+        self.name = name
+        self.compartments = tuple(compartments)
+        self.flows = list(flows)
+        self.params = ()
+        for f in self.flows:
+            for c in (f.source, f.target) + f.factors:
+                if c not in self.compartments:
+                    raise ValueError('Unknown compartment in ' + repr(f))
+            if f.source == f.target:
+                raise ValueError('Flow within one compartment: ' + repr(f))
+            if f.param not in self.params:
+                self.params += (f.param,)
+
+        for s in self.compartments + self.params:
+            if (not s.isidentifier() or keyword.iskeyword(s) or
+                    s in RESERVED):
+                raise ValueError('Invalid name: ' + repr(s))
+        if len(set(self.compartments + self.params)) < (
+                len(self.compartments) + len(self.params)):
+            raise ValueError('Compartment and parameter names must differ')
+
+        self._compile()
+
+    # Source code of the right hand side and the Jacobian
+    def source(self):
+        comps = self.compartments
+        k = len(comps)
+        header = ('def {0}(t, y, N, ' + ', '.join(self.params) + '):\n' +
+                  '    ' + ', '.join(comps) + (',' if k == 1 else '') +
+                  ' = y\n')
+
+        rhs = header.format('rhs')
+        for j, f in enumerate(self.flows):
+            rhs += '    f' + str(j) + ' = ' + f.expr() + '\n'
+        terms = []
+        for c in comps:
+            term = ''
+            for j, f in enumerate(self.flows):
+                if f.target == c:
+                    term += ' + f' + str(j)
+                elif f.source == c:
+                    term += ' - f' + str(j)
+            if term == '':
+                term = '0.0 * ' + c
+            elif term.startswith(' + '):
+                term = term[3:]
+            else:
+                term = '-' + term[3:]
+            terms.append(term)
+        rhs += '    return [' + ', '.join(terms) + ']\n'
+
+        jac = header.format('jac')
+        jac += ('    J = np.zeros((' + str(k) + ', ' + str(k) +
+                ') + np.shape(' + comps[0] + '))\n')
+        for i, ci in enumerate(comps):
+            for j, cj in enumerate(comps):
+                term = ''
+                for f in self.flows:
+                    d = f.dexpr(cj)
+                    if d is None:
+                        continue
+                    if f.target == ci:
+                        term += ' + ' + d
+                    elif f.source == ci:
+                        term += ' - ' + d
+                if term == '':
+                    continue
+                term = term[3:] if term.startswith(' + ') else '-' + term[3:]
+                jac += ('    J[' + str(i) + ', ' + str(j) + '] = ' + term +
+                        '\n')
+        jac += '    return J\n'
+        return rhs, jac
+
+    def _compile(self):
+        rhs, jac = self.source()
+        namespace = {'np': np}
+        exec(compile(rhs + '\n' + jac, '<' + self.name + ' model>', 'exec'),
+             namespace)
+        self._rhs = namespace['rhs']
+        self._jac = namespace['jac']
+
+    # The compiled functions are rebuilt when unpickled (e.g. in the worker
+    # processes of a batch solve)
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_rhs']
+        del state['_jac']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    # Right hand side: deriv(t, y, N, *params), params in self.params order
+    def deriv(self, t, y, N, *params):
+        return self._rhs(t, y, N, *params)
+
+    # Jacobian of deriv with respect to y, shape (ncomp, ncomp) + batch shape
+    def jac(self, t, y, N, *params):
+        return self._jac(t, y, N, *params)
+
+    # Solve n instances of the model at once (see batch.solve_batch).
+    # values: dict with N, the parameters and the initial values of all
+    #   compartments but the first (named e.g. 'I0'), each a scalar or an
+    #   array of shape (n,).
+    # transform, notify: see batch.solve_batch()
+    # Returns t, the trajectories (shape (ncomp, n, len(t))) and the
+    # compartment names, plus the chunk SolveStats if return_stats is True.
+    def solve_batch(self, values, n, tau, chunk=None, workers=1,
+                    method='RK45', return_stats=False, transform=None,
+                    notify=True):
+        # batch imports the model modules, which import this one
+        from . import batch
+        if chunk is None:
+            chunk = batch.CHUNK
+        comps = self.compartments
+        miss = [p for p in ('N',) + self.params +
+                tuple(c + '0' for c in comps[1:]) if p not in values]
+        if len(miss) > 0:
+            raise ValueError('Some required parameters are missing: ' +
+                             ','.join(miss))
+
+        N = np.broadcast_to(np.asarray(values['N'], dtype=float), (n,))
+        y0 = [np.broadcast_to(np.asarray(values[c + '0'], dtype=float), (n,))
+              for c in comps[1:]]
+        y0.insert(0, N - np.sum(y0, axis=0))
+
+        t = np.linspace(0, tau, tau)
+        args = [N] + [values[p] for p in self.params]
+        jac = self.jac if method in IMPLICIT else None
+        res = batch.solve_batch(self.deriv, np.array(y0), t, args,
+                                chunk=chunk, workers=workers, method=method,
+                                return_stats=return_stats, label=self.name,
+                                jac=jac, transform=transform, notify=notify)
+        if return_stats:
+            return t, res[0], comps, res[1]
+        return t, res, comps
+
+# Plot labels of the usual compartments
+LABELS = {
+    'S': 'Susceptible Population',
+    'E': 'Exposed Population',
+    'I': 'Infected Population',
+    'R': 'Recovered Population',
+    'D': 'Dead',
+}
+
+# Base class of models defined by a ModelSpec (class attribute SPEC).
+# Parameters are attributes named after self.SPEC.params, initial values
+# attributes named e.g. 'I0', and solve() sets one attribute per
+# compartment.
+class CompartmentModel:
+
+    SPEC = None
+
+    # N: total population (assumed constant)
+    # tau: time window in days over which to model
+    # kwargs: the parameters and the initial values (number, not fraction)
+    # of the compartments; initial values default to 0.
+    def __init__(self, N, tau, **kwargs):
+        spec = self.SPEC
+        logger.info('Initializing ' + spec.name + ' model ...')
+        miss = [p for p in spec.params if p not in kwargs]
+        if len(miss) > 0:
+            raise ValueError('Some required parameters are missing: ' +
+                             ','.join(miss))
+        self.N = N
+        for p in spec.params:
+            setattr(self, p, kwargs[p])
+        first = spec.compartments[0]
+        rest = 0
+        for c in spec.compartments[1:]:
+            setattr(self, c + '0', kwargs.get(c + '0', 0))
+            rest = rest + getattr(self, c + '0')
+        setattr(self, first + '0', N - rest)
+        self.tau = tau
+        self.t = np.linspace(0, self.tau, self.tau)
+        for c in spec.compartments:
+            setattr(self, c, None)
+        self.stats = None # SolveStats of the last call to solve()
+
+    # Solve the differential equations for this model
+    # method: any solve_ivp method, e.g. 'RK45' (default), 'LSODA'
+    # notify: pass self.stats to the instrument hooks; False when the
+    #   caller reports them itself (e.g. from a worker process)
+    def solve(self, method='RK45', notify=True):
+        spec = self.SPEC
+        y0 = [getattr(self, c + '0') for c in spec.compartments]
+        args = (self.N,) + tuple(getattr(self, p) for p in spec.params)
+
+        tspan = [0, self.tau]
+        kwargs = {'jac': spec.jac} if method in IMPLICIT else {}
+        sol, self.stats = instrument.solve(spec.deriv, tspan, y0,
+                                           method = method, label = spec.name,
+                                           t_eval = self.t, args = args,
+                                           notify = notify, **kwargs)
+
+        for k, c in enumerate(spec.compartments):
+            setattr(self, c, sol.y[k])
+
+    # Asynchronous counterpart of solve(), for use in an event loop: the
+    # integration runs in the worker pool of solver (an AsyncSolver, by
+    # default asyncsolve.default_solver()), and identical concurrent
+    # requests share one solve.
+    async def asolve(self, method='RK45', solver=None):
+        if solver is None:
+            solver = asyncsolve.default_solver()
+        return await solver.submit(self, method=method)
+
+    # Find the peak infection (day, number infected)
+    def peak(self):
+        if getattr(self, 'I', None) is None:
+            logger.error('solve() method has not been invoked yet')
+            raise ValueError("peak() method invoked before invoking solve()")
+
+        p = find_peaks(self.I, height = 0)
+        day = p[0][0]
+        infec = p[1]['peak_heights'][0]
+        return day, infec
+
+    # Plot the curves of all compartments
+    def plot(self):
+        comps = self.SPEC.compartments
+        if any(getattr(self, c) is None for c in comps):
+            logger.error('solve() method has not been invoked yet')
+            raise ValueError("plot() method invoked before invoking solve()")
+
+        logger.info('Plotting ' + self.SPEC.name + ' model ...')
+        fig = plt.figure()
+        ax = fig.add_subplot(111)
+
+        for c in comps:
+            ax.plot(self.t, getattr(self, c), label=LABELS.get(c, c))
+        ax.set_xlabel('Days')
+        ax.set_ylabel('Number of People')
+
+        ax.set_ylim(0, self.N+100)
+        legend = ax.legend()
+
+        plt.show()
+
+# Define a new model class from compartments and flows, e.g.
+#   SEIRS = build_model('SEIRS', ('S', 'E', 'I', 'R'),
+#                       [Flow('S', 'E', 'beta', ('S', 'I')),
+#                        Flow('E', 'I', 'sigma'), Flow('I', 'R', 'gamma'),
+#                        Flow('R', 'S', 'omega')])
+#   model = SEIRS(N=1000, beta=1.38, sigma=0.19, gamma=0.34, omega=0.01,
+#                 E0=1, I0=1, tau=365)
+def build_model(name, compartments, flows):
+    spec = ModelSpec(name, compartments, flows)
+    return type(name, (CompartmentModel,), {'SPEC': spec})
@@ -1,95 +1,108 @@
 #!/usr/bin/env python3
 
 import numpy as np
-from scipy.integrate import solve_ivp
-from scipy.signal import find_peaks
-import matplotlib.pyplot as plt
+from scipy.special import lambertw
 import logging
 
-from ..utils.modelargs import parse_args
+from ..utils.config import SIRConfig, from_args
+from .builder import Flow, ModelSpec, CompartmentModel
 
 logging.basicConfig(level = logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Compartments and flows of the model
+SPEC = ModelSpec('SIR', ('S', 'I', 'R'), [
+    Flow('S', 'I', 'beta', ('S', 'I')), # Infection
+    Flow('I', 'R', 'gamma'), # Recovery
+])
+
+# Right hand side of the differential equations (compiled from SPEC).
+# Written with elementwise operations only, so that y may also hold a batch
+# of states (one column per model instance) with array-valued parameters.
+diffeqns = SPEC.deriv
+
+# Number of log-spaced nodes used by the peak time quadrature
+PEAK_TIME_NODES = 256
+
+# Final number of susceptible people, S(inf). Along any SIR trajectory
+# S = S0 * exp(-beta * (R - R0) / (gamma * N)), and the epidemic ends when
+# I = 0, i.e. R = N - S. Solving for S gives the Lambert W expression below.
+# With no initial infection (I0 = 0) there is no epidemic and S stays S0.
+# All arguments may be numpy arrays (broadcast against each other).
+def final_susceptible(N, beta, gamma, I0, R0):
+    N, beta, gamma, I0, R0 = np.broadcast_arrays(*[np.asarray(a, dtype=float)
+                                        for a in (N, beta, gamma, I0, R0)])
+    S0 = N - I0 - R0
+    k = beta / (gamma * N)
+    arg = -k * S0 * np.exp(-k * (N - R0))
+    return np.where(I0 > 0, -np.real(lambertw(arg)) / k, S0)
+
+# Final epidemic size: number of people recovered once the epidemic is over
+def final_size(N, beta, gamma, I0, R0):
+    return np.asarray(N, dtype=float) - final_susceptible(N, beta, gamma, 
+                                                          I0, R0)
+
+# Peak number of infected people. S + I - rho * ln(S) is invariant, with
+# rho = gamma * N / beta, and I is maximal when S = rho. If S0 <= rho (or
+# I0 = 0) the infection never grows and the peak is I0 itself (at day 0).
+def peak_height(N, beta, gamma, I0, R0):
+    N, beta, gamma, I0, R0 = np.broadcast_arrays(*[np.asarray(a, dtype=float)
+                                        for a in (N, beta, gamma, I0, R0)])
+    S0 = N - I0 - R0
+    rho = gamma * N / beta
+    grows = (S0 > rho) & (I0 > 0)
+    rhos = np.where(grows, rho, S0)
+    return np.where(grows, I0 + S0 - rhos + rhos * np.log(rhos / S0), I0)
+
+# Approximate day of the peak infection. Along the trajectory
+# dt = -N dS / (beta * S * I(S)), with I(S) given by the S-I invariant, so
+# t_peak is the integral of N / (beta * S * I(S)) for S from rho to S0. The
+# integral is evaluated with the trapezoidal rule on nodes that are 
+# log-spaced in (S0 - S), which resolves the steep start of the epidemic.
+def peak_time(N, beta, gamma, I0, R0, nodes=PEAK_TIME_NODES):
+    N, beta, gamma, I0, R0 = np.broadcast_arrays(*[np.asarray(a, dtype=float)
+                                        for a in (N, beta, gamma, I0, R0)])
+    S0 = N - I0 - R0
+    rho = gamma * N / beta
+    grows = (S0 > rho) & (I0 > 0)
+    span = np.where(grows, S0 - rho, 1.0)[..., np.newaxis]
+    
+    x = np.linspace(np.log(1e-12), 0.0, nodes)
+    d = span * np.exp(x) # distance S0 - S at each node
+    S = S0[..., np.newaxis] - d
+    I = I0[..., np.newaxis] + d + rho[..., np.newaxis] * np.log(
+                                                S / S0[..., np.newaxis])
+    # Integrate in log(d): dS = d * dlog(d)
+    f = N[..., np.newaxis] * d / (beta[..., np.newaxis] * S * I)
+    dx = x[1] - x[0]
+    t = dx * (f.sum(axis=-1) - 0.5 * (f[..., 0] + f[..., -1])) + f[..., 0]
+    return np.where(grows, t, 0.0)
+
 # Susceptible -> Infected -> Recovered model
-class SIR:
+class SIR(CompartmentModel):
+    
+    SPEC = SPEC
     
+    # N: total population (assumed constant)
+    # beta: daily contact rate (for adequate contact)
+    # gamma: proportionality constant of daily recovery
+    # I0, R0: initial infected and recovered populations (numbers, not
+    #   fractions)
+    # tau: time window in days over which to model
     def __init__(self, N, beta, gamma, I0, R0, tau):
-        logger.info('Intializing SIR model ...')
-        self.N = N # Total population (assumed constant)
-        self.beta = beta # Daily contact rate (for adequate contact)
-        self.gamma = gamma # Proportionality constant of daily recovery
-        self.I0 = I0 # Initial infected population (number, not fraction)
-        self.R0 = R0 # Initial recovered population (number, not fraction)
-        # Initial susceptible population (number, not a fraction)
-        self.S0 = N - I0 - R0
-        self.tau = tau # Time window in days over which to model
-        self.t = np.linspace(0, self.tau, self.tau)
-        self.S = None
-        self.I = None
-        self.R = None
+        super().__init__(N=N, tau=tau, beta=beta, gamma=gamma, I0=I0, R0=R0)
     
-    # Solve the differential equatons for this model
-    def solve(self):
-        
-        def diffeqns(t, y, N, beta, gamma):
-
-            S, I, R = y
-            dSdt = -beta * S * I / N
-            dIdt = beta * S * I / N - gamma * I
-            dRdt = gamma * I
-        
-            dydt = [dSdt, dIdt, dRdt]
-            return dydt
-        
-        y0 = [self.S0, self.I0, self.R0] # Initial values
-        
-        # Solve differntial equations
-        tspan = [0, self.tau]
-        sol = solve_ivp(diffeqns, tspan, y0, 
-                     t_eval = self.t, args=(self.N, self.beta, self.gamma))
-        
-        self.S = sol.y[0]
-        self.I = sol.y[1]
-        self.R = sol.y[2]
+    # Final epidemic size (number recovered at the end), without solving
+    def final_size(self):
+        return final_size(self.N, self.beta, self.gamma, self.I0, self.R0)
     
-    # Find the peak infection (day, number infected)
-    def peak(self):
-        if self.I is None:
-            logger.error('solve() method has not been invoked yet')
-            raise ValueError("peak() method invoked before invoking solve()")
-        
-        p = find_peaks(self.I, height = 0)
-        day = p[0][0]
-        infec = p[1]['peak_heights'][0]
-        return day, infec
+    # Peak number infected, without solving
+    def peak_height(self):
+        return peak_height(self.N, self.beta, self.gamma, self.I0, self.R0)
     
-    # Plot the S, I and R curves
-    def plot(self):
-        if self.S is None or self.I is None or self.R is None:
-            logger.error('solve() method has not been invoked yet')
-            raise ValueError("plot() method invoked before invoking solve()")
-        
-        logger.info('Plotting SIR model ...')
-        S = self.S
-        I = self.I
-        R = self.R
-        t = self.t
-        N = self.N
-        
-        fig = plt.figure()
-        ax = fig.add_subplot(111)
-        
-        ax.plot(t, S, label='Susceptible Population')
-        ax.plot(t, I, label='Infected Population')
-        ax.plot(t, R, label='Recovered Population')
-        ax.set_xlabel('Days')
-        ax.set_ylabel('Number of People')
-        
-        ax.set_ylim(0, N+100)
-        legend = ax.legend()
-        
-        plt.show()
+    # Approximate day of the peak infection, without solving
+    def peak_time(self):
+        return peak_time(self.N, self.beta, self.gamma, self.I0, self.R0)
 
 def usage():
     usagestr0 = './sir.py N=<N> I0=<I0> R0=<R0> beta=<beta> gamma=<gamma> tau=<tau>, where: \n'
@@ -107,55 +120,9 @@ def usage():
     
 if __name__ == "__main__":
     
-    res = parse_args()
-    if res is None:
-        logger.error('No argument passed.')
-        usage()
-        quit()
-        
-    if res == 'usage':
-        usage()
-        quit()
-        
-    if isinstance(res, dict):
-        miss = []
-        if 'N' in res:
-            N = res['N']
-        else:
-            miss.append('N')
-            
-        if 'beta' in res:
-            beta = res['beta']
-        else:
-            miss.append('beta')
-        
-        if 'gamma' in res:
-            gamma = res['gamma']
-        else:
-            miss.append('gamma')
-            
-        if 'I0' in res:
-            I0 = res['I0']
-        else:
-            miss.append('I0')
-            
-        if 'R0' in res:
-            R0 = res['R0']
-        else:
-            miss.append('R0')
-            
-        if 'tau' in res:
-            tau = res['tau']
-        else:
-            miss.append('tau')
-            
-        if len(miss) > 0:
-            logger.error('Some required arguments are missing: ' + ','.join(miss))
-            usage()
-            quit()
-
-    model = SIR(N=N, beta=beta, gamma=gamma, I0=I0, R0=R0, tau=tau)
+    config = from_args(SIRConfig, usage)
+    model = SIR(**config.as_dict())
     
     model.solve()
     
-    model.plot()
\ No newline at end of file
+    model.plot()
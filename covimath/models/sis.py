@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 
+import sys
 from math import exp
 import numpy as np
 import matplotlib.pyplot as plt
 import logging
 
-from ..utils.modelargs import parse_args
+from ..utils.config import SISConfig, from_args
 
 logging.basicConfig(level = logging.INFO)
 logger = logging.getLogger(__name__)
@@ -111,60 +112,11 @@ def usage():
         
 if __name__ == "__main__":
     
-    res = parse_args()
-    if res is None:
-        logger.error('No argument passed.')
-        usage()
-        quit()
-        
-    if res == 'usage':
-        usage()
-        quit()
-        
-    if isinstance(res, dict):
-        miss = []
-        if 'N' in res:
-            N = res['N']
-        else:
-            miss.append('N')
-            
-        if 'lambda' in res:
-            lam = res['lambda']
-        else:
-            miss.append('lambda')
-            
-        if 'mu' in res:
-            mu = res['mu']
-        else:
-            miss.append('mu')
-        
-        if 'gamma' in res:
-            gamma = res['gamma']
-        else:
-            miss.append('gamma')
-            
-        if 'I0' in res:
-            I0 = res['I0']
-        else:
-            miss.append('I0')
-            
-        if 'tau' in res:
-            tau = res['tau']
-        else:
-            miss.append('tau')
-        
-        plotabs = False
-        if '--abs' in res:
-            plotabs = True
-            
-        if len(miss) > 0:
-            logger.error('Some required arguments are missing: ' + ','.join(miss))
-            usage()
-            quit()
-
-    model = SIS(N=N, lam=lam, mu=mu, gamma=gamma, I0=I0, tau=tau)
+    config = from_args(SISConfig, usage)
+    plotabs = '--abs' in sys.argv[1:]
+    model = SIS(**config.as_dict())
     
     if plotabs:
         model.plot(absolute=True)
     else:
-        model.plot()
\ No newline at end of file
+        model.plot()
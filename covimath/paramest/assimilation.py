@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from scipy.special import gammaln
+import logging
+
+from ..models.batch import get_spec, solve_batch
+from ..utils import rng
+
+logging.basicConfig(level = logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Sequential estimation of the states and parameters of a model (e.g.
+# 'SEIR' or 'SEIRD') from daily counts of new cases, with a bootstrap
+# particle filter. Each particle carries a state and a set of parameters.
+# A daily update advances all particles by one day in a single vectorized
+# solve, weights them by the likelihood of the day's count, resamples them
+# when the weights have degenerated and moves the parameters by one day of
+# their random walk, so its cost does not grow with the length of the
+# history.
+#
+# New cases on a day are the people who entered compartment 'I', i.e. the
+# decrease of the compartments that precede 'I' (S, or S and E).
+class ParticleFilter:
+
+    # model: model name or ModelSpec
+    # N: total population (assumed constant)
+    # priors: parameter -> value, or (low, high) for a uniform prior
+    # initial: initial value of each compartment but the first (e.g. 'E0',
+    #   'I0'); a value, or (low, high) for a uniform prior; defaults to 0
+    # particles: number of particles
+    # jitter: standard deviation of the daily log-normal random walk of
+    #   the parameters that have a prior range (keeps the ensemble diverse)
+    # dispersion: None for Poisson counts, or the size parameter of a
+    #   negative binomial observation model (smaller means noisier data)
+    # resample: resample when the effective sample size drops below this
+    #   fraction of the particles
+    # seed: see covimath.utils.rng; the seed used is kept in self.seed
+    def __init__(self, model, N, priors, initial, particles=1000,
+                 jitter=0.02, dispersion=None, resample=0.5, seed=None):
+        self.spec = get_spec(model)
+        logger.info('Initializing particle filter for %s model ...',
+                    self.spec.name)
+        comps = self.spec.compartments
+        if 'I' not in comps:
+            raise ValueError('Model has no infected compartment I')
+        miss = [p for p in self.spec.params if p not in priors]
+        if len(miss) > 0:
+            raise ValueError('Some required parameters are missing: ' +
+                             ','.join(miss))
+
+        self.N = N
+        self.n = particles
+        self.jitter = jitter
+        self.dispersion = dispersion
+        self.resample = resample
+        seed = rng.seed_sequence(seed)
+        self.seed = rng.describe(seed)
+        self.rng = rng.generator(seed)
+        self.before = list(range(comps.index('I'))) # Compartments before I
+
+        self.varied = [p for p in self.spec.params
+                       if isinstance(priors[p], (tuple, list))]
+        self.params = {p: self._draw(priors[p]) for p in self.spec.params}
+
+        y = [self._draw(initial.get(c + '0', 0)) for c in comps[1:]]
+        y.insert(0, N - np.sum(y, axis=0))
+        self.y = np.array(y) # States, shape (ncomp, particles)
+
+        self.weights = np.full(self.n, 1.0 / self.n)
+        self.day = 0
+        self.loglik = 0.0 # Log likelihood of all data so far
+        self.history = [] # Estimate after each update
+
+    def _draw(self, prior):
+        if isinstance(prior, (tuple, list)):
+            return self.rng.uniform(prior[0], prior[1], self.n)
+        return np.full(self.n, float(prior))
+
+    # Advance states y by days, for all particles at once. Returns the
+    # trajectories, shape (ncomp, particles, days + 1).
+    def _advance(self, y, days):
+        args = [self.N] + [self.params[p] for p in self.spec.params]
+        t = np.arange(days + 1, dtype=float)
+        return solve_batch(self.spec.deriv, y, t, args, chunk=self.n,
+                           label=self.spec.name)
+
+    # Log likelihood of count given the expected counts of the particles
+    def _loglik(self, count, mean):
+        mean = np.maximum(mean, 1e-9)
+        if self.dispersion is None:
+            return count * np.log(mean) - mean - gammaln(count + 1)
+        r = self.dispersion
+        return (gammaln(count + r) - gammaln(r) - gammaln(count + 1) +
+                r * np.log(r / (r + mean)) + count * np.log(mean / (r + mean)))
+
+    # Systematic resampling
+    def _resample(self):
+        u = (self.rng.random() + np.arange(self.n)) / self.n
+        idx = np.minimum(np.searchsorted(np.cumsum(self.weights), u),
+                         self.n - 1)
+        self.y = self.y[:, idx]
+        for p in self.spec.params:
+            self.params[p] = self.params[p][idx]
+        self.weights = np.full(self.n, 1.0 / self.n)
+
+    # One day of the parameter random walk
+    def _jitter(self):
+        for p in self.varied:
+            self.params[p] = self.params[p] * np.exp(
+                self.jitter * self.rng.standard_normal(self.n))
+
+    # Assimilate the count of new cases of the next day
+    def step(self, count):
+        y = self._advance(self.y, 1)[:, :, -1]
+        cases = (self.y[self.before].sum(axis=0) - y[self.before].sum(axis=0))
+        self.y = np.maximum(y, 0.0)
+
+        logw = np.log(self.weights) + self._loglik(count, cases)
+        top = np.max(logw)
+        w = np.exp(logw - top)
+        self.loglik += top + np.log(np.sum(w))
+        self.weights = w / np.sum(w)
+        self.day += 1
+
+        self.history.append(self.estimate())
+        if 1.0 / np.sum(self.weights ** 2) < self.resample * self.n:
+            self._resample()
+        self._jitter()
+
+    # Assimilate the counts of several consecutive days
+    def update(self, counts):
+        for count in counts:
+            self.step(count)
+
+    # Weighted means of the parameters and of the current states
+    def estimate(self):
+        res = {p: float(np.dot(self.weights, self.params[p]))
+               for p in self.spec.params}
+        for k, c in enumerate(self.spec.compartments):
+            res[c] = float(np.dot(self.weights, self.y[k]))
+        res['day'] = self.day
+        return res
+
+    # Weighted quantiles of a parameter or compartment over the particles
+    def quantiles(self, name, q=(0.05, 0.5, 0.95)):
+        if name in self.params:
+            x = self.params[name]
+        else:
+            x = self.y[self.spec.compartments.index(name)]
+        order = np.argsort(x)
+        cw = np.cumsum(self.weights[order])
+        return x[order][np.minimum(np.searchsorted(cw, q), self.n - 1)]
+
+    # Forecast from the current states: trajectories of all particles for
+    # the next days, shape (ncomp, particles, days + 1), with the particle
+    # weights
+    def forecast(self, days):
+        return self._advance(self.y, days), self.weights.copy()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from scipy.stats import norm, qmc
+import logging
+
+from ..models.batch import solve_model, OUTPUTS, CHUNK
+from ..utils import rng
+
+logging.basicConfig(level = logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Saltelli sampling scheme on scrambled Sobol points.
+# bounds: dict of parameter name -> (low, high).
+# n: base sample size (a power of 2 keeps the Sobol sequence balanced).
+# seed: see covimath.utils.rng
+# Returns the matrices A and B, shape (n, d), and AB, shape (d, n, d), where
+# AB[i] is A with its i-th column taken from B.
+def saltelli_sample(bounds, n, seed=None):
+    names = list(bounds)
+    d = len(names)
+    lo = np.array([bounds[p][0] for p in names], dtype=float)
+    hi = np.array([bounds[p][1] for p in names], dtype=float)
+
+    base = qmc.Sobol(d=2 * d, scramble=True,
+                     seed=rng.generator(seed)).random(n)
+    A = qmc.scale(base[:, :d], lo, hi)
+    B = qmc.scale(base[:, d:], lo, hi)
+
+    AB = np.repeat(A[np.newaxis, :, :], d, axis=0)
+    for i in range(d):
+        AB[i, :, i] = B[:, i]
+
+    return A, B, AB
+
+# Evaluate model outputs over the rows of X (one column per name).
+# fixed: N, initial values and any rate parameter that is not sampled.
+# Returns dict of output name -> array of shape (len(X),).
+def evaluate(model, names, X, fixed, tau, outputs, chunk=CHUNK, workers=1):
+    X = np.atleast_2d(X)
+    values = dict(fixed)
+    for j, p in enumerate(names):
+        values[p] = X[:, j]
+
+    t, y, comps = solve_model(model, values, X.shape[0], tau, chunk=chunk,
+                              workers=workers)
+
+    return {o: OUTPUTS[o](y, t, comps) for o in outputs}
+
+# First order (S1) and total (ST) Sobol indices from model outputs on the
+# Saltelli matrices, using the Saltelli (2010) and Jansen estimators.
+# fA, fB: shape (..., n); fAB: shape (..., d, n)
+def _indices(fA, fB, fAB):
+    V = np.var(np.concatenate([fA, fB], axis=-1), axis=-1)[..., np.newaxis]
+    V = np.where(V > 0, V, np.nan)
+    fA = fA[..., np.newaxis, :]
+    fB = fB[..., np.newaxis, :]
+    S1 = np.mean(fB * (fAB - fA), axis=-1) / V
+    ST = 0.5 * np.mean((fA - fAB) ** 2, axis=-1) / V
+    return S1, ST
+
+# Sobol indices with bootstrap confidence intervals (half-width at level
+# conf, from the normal approximation of the bootstrap distribution).
+def indices(fA, fB, fAB, nboot=100, conf=0.95, seed=None):
+    S1, ST = _indices(fA, fB, fAB)
+
+    n = fA.shape[0]
+    idx = rng.generator(seed).integers(0, n, size=(nboot, n))
+    bS1, bST = _indices(fA[idx], fB[idx], fAB[:, idx].swapaxes(0, 1))
+
+    z = norm.ppf(0.5 + conf / 2)
+    return {'S1': S1, 'S1_conf': z * np.std(bS1, axis=0, ddof=1),
+            'ST': ST, 'ST_conf': z * np.std(bST, axis=0, ddof=1)}
+
+# Global sensitivity analysis of a model.
+# model: 'SIR', 'SEIR' or 'SEIRD'
+# bounds: dict of sampled parameter -> (low, high), e.g.
+#   {'beta': (1.0, 1.8), 'gamma': (0.2, 0.5)}
+# fixed: dict with N, the initial values and the rates not sampled
+# outputs: names from OUTPUTS
+# n: base sample size; the model is evaluated n * (d + 2) times
+# seed: see covimath.utils.rng; the sample and the bootstrap of each output
+#   use separate streams spawned from it
+# Returns dict of output name -> dict with the parameter names, arrays
+# S1, S1_conf, ST, ST_conf (one entry per parameter) and the seed used
+# (passing it back as seed repeats the analysis).
+def analyze(model, bounds, fixed, tau, outputs=('peak_day', 'peak_height'),
+            n=1024, nboot=100, conf=0.95, seed=None, chunk=CHUNK, workers=1):
+    logger.info('Running Sobol sensitivity analysis of %s model ...', model)
+    names = list(bounds)
+    d = len(names)
+    root = rng.seed_sequence(seed)
+    seeds = root.spawn(1 + len(outputs))
+    A, B, AB = saltelli_sample(bounds, n, seed=seeds[0])
+    X = np.concatenate([A, B, AB.reshape(d * n, d)])
+
+    f = evaluate(model, names, X, fixed, tau, outputs, chunk=chunk,
+                 workers=workers)
+
+    res = {}
+    for k, o in enumerate(outputs):
+        fA = f[o][:n]
+        fB = f[o][n:2 * n]
+        fAB = f[o][2 * n:].reshape(d, n)
+        res[o] = indices(fA, fB, fAB, nboot=nboot, conf=conf,
+                         seed=seeds[k + 1])
+        res[o]['names'] = names
+        res[o]['seed'] = rng.describe(root)
+
+    return res
@@ -0,0 +1,60 @@
+from covimath.models import seir, seird
+from covimath.paramest.assimilation import ParticleFilter
+import numpy as np
+import pytest
+
+def daily_cases(model):
+    # New cases per day: people leaving S and E
+    model.t = np.arange(model.tau + 1.0)
+    model.solve()
+    return np.rint(-np.diff(model.S + model.E))
+
+def test_seir_beta():
+    model = seir.SEIR(N=100000, beta=0.9, sigma=0.2, gamma=0.34, 
+                      E0=10, I0=10, R0=0, tau=60)
+    cases = daily_cases(model)
+    
+    pf = ParticleFilter('SEIR', 100000, 
+                        {'beta': (0.5, 1.5), 'sigma': 0.2, 'gamma': 0.34}, 
+                        {'E0': (0, 30), 'I0': 10}, particles=500, seed=1)
+    pf.update(cases)
+    est = pf.estimate()
+    
+    assert pf.day == 60 and len(pf.history) == 60
+    assert pytest.approx(0.9, rel=0.05) == est['beta']
+    assert pytest.approx(model.I[-1], rel=0.05) == est['I']
+    lo, mid, hi = pf.quantiles('beta')
+    assert lo <= mid <= hi
+    
+def test_seird_forecast():
+    model = seird.SEIRD(N=10000, beta=1.38, sigma=0.19, gamma=0.34, mu=0.03,
+                        E0=1, I0=1, R0=0, D0=0, tau=20)
+    cases = daily_cases(model)
+    
+    pf = ParticleFilter('SEIRD', 10000, 
+                        {'beta': (1.0, 1.8), 'sigma': 0.19, 'gamma': 0.34,
+                         'mu': (0.01, 0.05)}, 
+                        {'E0': 1, 'I0': 1}, particles=200, 
+                        dispersion=10, seed=1)
+    pf.update(cases)
+    y, w = pf.forecast(10)
+    
+    assert y.shape == (5, 200, 11)
+    assert w.sum() == pytest.approx(1)
+    assert np.all(np.diff(np.dot(w, y[4])) >= 0) # deaths only increase
+    
+def test_missing_param():
+    with pytest.raises(ValueError):
+        ParticleFilter('SEIR', 1000, {'beta': (0.5, 1.5)}, {'I0': 1})
+    
+def test_daily_jitter():
+    # The parameter random walk runs every day, even without resampling
+    pf = ParticleFilter('SIR', 10000, {'beta': (0.5, 1.5), 'gamma': 0.34},
+                        {'I0': 10}, particles=100, jitter=0.1, resample=0.0,
+                        seed=1)
+    beta = pf.params['beta'].copy()
+    pf.step(3)
+    
+    ratio = np.log(pf.params['beta'] / beta)
+    assert 0.05 < np.std(ratio) < 0.15
+    assert np.all(pf.params['gamma'] == 0.34)
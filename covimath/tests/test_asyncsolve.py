@@ -0,0 +1,153 @@
+from covimath.models import seird
+from covimath.models.asyncsolve import AsyncSolver
+from covimath.utils import instrument
+import asyncio
+import threading
+import numpy as np
+import pytest
+
+def make_model(beta=1.38):
+    return seird.SEIRD(N=1000, beta=beta, sigma = 0.19, gamma=0.34, mu=0.03,
+                       E0=1, I0=1, R0=0, D0=0, tau=150)
+
+def test_asolve():
+    model = make_model()
+    asyncio.run(model.asolve())
+    
+    assert pytest.approx(125, 1) == model.peak()[1]
+    
+def test_coalesce():
+    seen = []
+    
+    async def run():
+        async with AsyncSolver(max_workers=2) as solver:
+            models = [make_model() for _ in range(5)] + [make_model(1.0)]
+            await solver.map(models)
+            return models
+    
+    instrument.add_hook(seen.append)
+    try:
+        models = asyncio.run(run())
+    finally:
+        instrument.remove_hook(seen.append)
+    
+    # Five identical requests share a single solve
+    assert len(seen) == 2
+    assert all(np.array_equal(m.I, models[0].I) for m in models[:5])
+    assert models[5].peak()[1] < models[0].peak()[1]
+    
+def test_backpressure():
+    async def run():
+        async with AsyncSolver(max_workers=1, max_queue=1) as solver:
+            models = [make_model(b) for b in np.linspace(1.0, 1.6, 6)]
+            await solver.map(models)
+            return models
+    
+    models = asyncio.run(run())
+    for m in models:
+        expected = make_model(m.beta)
+        expected.solve()
+        assert np.array_equal(m.I, expected.I)
+    
+def test_solve_batch():
+    values = {'N': 1000, 'beta': np.array([1.0, 1.38]), 'sigma': 0.19, 
+              'gamma': 0.34, 'mu': 0.03, 'E0': 1, 'I0': 1, 'R0': 0, 'D0': 0}
+    
+    async def run():
+        async with AsyncSolver() as solver:
+            return await solver.solve_batch('SEIRD', values, 2, 150)
+    
+    t, y, comps = asyncio.run(run())
+    assert y.shape == (5, 2, 150)
+    
+def test_reuse_after_cancel():
+    solver = AsyncSolver(max_workers=1)
+    models = [make_model(b) for b in np.linspace(1.0, 1.6, 5)]
+    
+    async def timeout():
+        await asyncio.wait_for(solver.map(models), 0.001)
+    
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(timeout())
+    
+    # Same solver in a new event loop
+    async def run():
+        await solver.submit(models[-1])
+        await solver.close()
+        # And again after close()
+        await solver.submit(models[0])
+    
+    asyncio.run(asyncio.wait_for(run(), 10))
+    assert models[-1].I is not None and models[0].I is not None
+    assert solver._inflight == {}
+    
+def test_key_time_points():
+    a = make_model()
+    b = make_model()
+    b.t = np.arange(151.0)
+    
+    async def run():
+        async with AsyncSolver(max_workers=2) as solver:
+            await solver.map([a, b])
+    
+    asyncio.run(run())
+    assert len(a.I) == 150 and len(b.I) == 151
+    
+GATE = threading.Event()
+
+class Blocked(seird.SEIRD):
+    # Solve only once GATE is set
+    def solve(self, *args, **kwargs):
+        GATE.wait(10)
+        super().solve(*args, **kwargs)
+    
+def test_cancel_while_blocked():
+    async def run():
+        solver = AsyncSolver(max_workers=1, max_queue=1)
+        # One request running, one queued: the queue is full
+        blockers = [asyncio.ensure_future(solver.submit(
+            Blocked(N=1000, beta=b, sigma=0.19, gamma=0.34, mu=0.03, E0=1, 
+                    I0=1, R0=0, D0=0, tau=150))) for b in (1.0, 1.1)]
+        await asyncio.sleep(0.05)
+        a = asyncio.ensure_future(solver.submit(make_model()))
+        await asyncio.sleep(0.05) # a waits for room in the queue
+        model = make_model()
+        b = asyncio.ensure_future(solver.submit(model))
+        await asyncio.sleep(0.05) # b joins the request of a
+        a.cancel()
+        await asyncio.sleep(0.05)
+        GATE.set()
+        await asyncio.wait_for(b, 10)
+        await asyncio.gather(*blockers)
+        await solver.close()
+        return a, model
+    
+    try:
+        a, model = asyncio.run(run())
+    finally:
+        GATE.set()
+    assert a.cancelled()
+    assert pytest.approx(125, 1) == model.peak()[1]
+    
+def test_process_hooks():
+    seen = []
+    values = {'N': 1000, 'beta': np.array([1.0, 1.38]), 'sigma': 0.19, 
+              'gamma': 0.34, 'mu': 0.03, 'E0': 1, 'I0': 1, 'R0': 0, 'D0': 0}
+    
+    async def run():
+        async with AsyncSolver(max_workers=2, processes=True) as solver:
+            models = [make_model(1.0), make_model(1.38)]
+            await solver.map(models)
+            res = await solver.solve_batch('SEIRD', values, 2, 150, chunk=1)
+            return models, res
+    
+    instrument.add_hook(seen.append)
+    try:
+        models, res = asyncio.run(run())
+    finally:
+        instrument.remove_hook(seen.append)
+    
+    # Hooks run in this process: two solves and two batch chunks
+    assert len(seen) == 4
+    assert seen[0].nfev > 0 and models[0].stats is not None
+    assert len(res) == 3 and res[1].shape == (5, 2, 150)
@@ -0,0 +1,30 @@
+from covimath.models import seird
+from covimath.models.batch import solve_batch
+import numpy as np
+import pytest
+
+def test_batch_matches_solve():
+    N = 1000
+    beta = np.array([1.38, 1.0, 0.8])
+    y0 = np.array([[N - 2] * 3, [1] * 3, [1] * 3, [0] * 3, [0] * 3])
+    t = np.linspace(0, 150, 150)
+    y = solve_batch(seird.diffeqns, y0, t, [N, beta, 0.19, 0.34, 0.03])
+    
+    assert y.shape == (5, 3, 150)
+    for k in range(3):
+        model = seird.SEIRD(N=N, beta=beta[k], sigma = 0.19, gamma=0.34, 
+                            mu=0.03, E0=1, I0=1, R0=0, D0=0, tau=150)
+        model.solve()
+        assert pytest.approx(model.peak()[1], rel=0.01) == np.max(y[2, k])
+        assert pytest.approx(model.D[-1], rel=0.01) == y[4, k, -1]
+
+def test_batch_workers():
+    N = 1000
+    beta = np.linspace(0.8, 1.6, 10)
+    y0 = np.array([[N - 2] * 10, [1] * 10, [1] * 10, [0] * 10, [0] * 10])
+    t = np.linspace(0, 150, 150)
+    args = [N, beta, 0.19, 0.34, 0.03]
+    y1 = solve_batch(seird.diffeqns, y0, t, args, chunk=4)
+    y2 = solve_batch(seird.diffeqns, y0, t, args, chunk=4, workers=2)
+    
+    assert np.array_equal(y1, y2)
@@ -0,0 +1,79 @@
+from covimath.models.builder import Flow, ModelSpec, build_model
+from covimath.models import seird
+from covimath.models.batch import solve_model
+import numpy as np
+import pytest
+
+def make_seirs():
+    return build_model('SEIRS', ('S', 'E', 'I', 'R'), 
+                       [Flow('S', 'E', 'beta', ('S', 'I')),
+                        Flow('E', 'I', 'sigma'), Flow('I', 'R', 'gamma'),
+                        Flow('R', 'S', 'omega')])
+
+def test_rhs():
+    y = np.array([900., 40., 50., 8., 2.])
+    dy = seird.diffeqns(0, y, 1000, 1.38, 0.19, 0.34, 0.03)
+    S, E, I, R, D = y
+    assert dy[0] == -1.38 * S * I / 1000
+    assert dy[2] == 0.19 * E - 0.34 * I - 0.03 * I
+    assert sum(dy) == pytest.approx(0)
+    
+def test_jacobian():
+    y = np.array([900., 40., 50., 8., 2.])
+    args = (1000, 1.38, 0.19, 0.34, 0.03)
+    J = seird.SPEC.jac(0, y, *args)
+    
+    eps = 1e-6
+    for j in range(5):
+        dy = np.zeros(5)
+        dy[j] = eps
+        col = (np.array(seird.diffeqns(0, y + dy, *args)) - 
+               np.array(seird.diffeqns(0, y - dy, *args))) / (2 * eps)
+        assert J[:, j] == pytest.approx(col, rel=1e-6, abs=1e-9)
+    
+def test_built_model():
+    SEIRS = make_seirs()
+    model = SEIRS(N=1000, beta=1.38, sigma=0.19, gamma=0.34, omega=0.01,
+                  E0=1, I0=1, tau=365)
+    model.solve()
+    
+    # Waning immunity: the infection becomes endemic instead of dying out
+    assert model.I[-1] > 10
+    assert model.S + model.E + model.I + model.R == pytest.approx(1000)
+    
+    # With no waning, SEIRS reduces to SEIR (SEIRD with mu = 0)
+    model = SEIRS(N=1000, beta=1.38, sigma=0.19, gamma=0.34, omega=0.0,
+                  E0=1, I0=1, tau=150)
+    model.solve()
+    assert pytest.approx(141, 1) == model.peak()[1]
+    
+def test_built_batch():
+    SEIRS = make_seirs()
+    values = {'N': 1000, 'beta': 1.38, 'sigma': 0.19, 'gamma': 0.34,
+              'omega': np.array([0.0, 0.01]), 'E0': 1, 'I0': 1, 'R0': 0}
+    t, y, comps = solve_model(SEIRS.SPEC, values, 2, 365)
+    
+    model = SEIRS(N=1000, beta=1.38, sigma=0.19, gamma=0.34, omega=0.01,
+                  E0=1, I0=1, tau=365)
+    model.solve()
+    assert comps == ('S', 'E', 'I', 'R')
+    assert pytest.approx(model.I[-1], rel=0.01) == y[2, 1, -1]
+    
+def test_implicit_batch():
+    values = {'N': 1000, 'beta': np.array([1.0, 1.38]), 'sigma': 0.19, 
+              'gamma': 0.34, 'mu': 0.03, 'E0': 1, 'I0': 1, 'R0': 0, 'D0': 0}
+    t, y, comps = solve_model('SEIRD', values, 2, 150)
+    t, yb, comps = solve_model('SEIRD', values, 2, 150, method='BDF')
+    
+    assert np.max(yb[2], axis=1) == pytest.approx(np.max(y[2], axis=1), 
+                                                  rel=0.01)
+    
+def test_invalid_spec():
+    with pytest.raises(ValueError):
+        ModelSpec('X', ('S', 'I'), [Flow('S', 'Q', 'beta')])
+    with pytest.raises(ValueError):
+        ModelSpec('X', ('S', 'N'), [Flow('S', 'N', 'beta')])
+    with pytest.raises(ValueError):
+        ModelSpec('X', ('S', 'I'), [Flow('S', 'I', 'I')])
+    with pytest.raises(ValueError):
+        make_seirs()(N=1000, beta=1.38, sigma=0.19, gamma=0.34, tau=150)
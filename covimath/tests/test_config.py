@@ -0,0 +1,56 @@
+from covimath.utils.config import (SIRConfig, SEIRDConfig, SISConfig,
+                                   validate_batch, from_table, from_args)
+from covimath.utils.modelargs import parse_args
+from covimath.models.seird import SEIRD
+import numpy as np
+import pytest
+
+args = {'N': 1000, 'beta': 1.38, 'sigma': 0.19, 'gamma': 0.34, 'mu': 0.03,
+        'E0': 1, 'I0': 1, 'R0': 0, 'D0': 0, 'tau': 150}
+
+def test_config():
+    config = SEIRDConfig(**args)
+    assert config.N == 1000 and isinstance(config.N, int)
+    assert config.as_dict() == args
+    model = SEIRD(**config.as_dict())
+    assert model.S0 == 998
+    with pytest.raises(AttributeError):
+        config.beta2 = 1.0
+
+def test_invalid():
+    with pytest.raises(ValueError, match='missing: sigma'):
+        SEIRDConfig(**{k: v for k, v in args.items() if k != 'sigma'})
+    with pytest.raises(ValueError, match='positive'):
+        SEIRDConfig(**dict(args, mu=0))
+    with pytest.raises(ValueError, match='integer'):
+        SEIRDConfig(**dict(args, I0=1.5))
+    with pytest.raises(ValueError, match='more than N'):
+        SIRConfig(N=10, I0=8, R0=5, beta=1.0, gamma=0.5, tau=10)
+
+def test_batch():
+    n = 10000
+    table = dict(args, beta=np.linspace(-0.5, 2.0, n),
+                 I0=np.arange(n) % 1200)
+    valid = validate_batch(SEIRDConfig, table)
+    expect = (table['beta'] > 0) & (table['I0'] + 1 <= 1000)
+    assert np.array_equal(valid, expect)
+
+    configs = from_table(SEIRDConfig, table)
+    assert len(configs) == np.sum(expect)
+    k = np.flatnonzero(expect)[7]
+    assert configs[7] == SEIRDConfig(**dict(args, beta=table['beta'][k],
+                                           I0=int(table['I0'][k])))
+
+def test_args():
+    argv = ['N=1000', 'I0=1', 'lambda=0.05', 'mu=0.15', 'gamma=0.1',
+            'tau=30', '--abs']
+    res = parse_args(argv)
+    assert res['lambda'] == 0.05 and res['--abs'] is None
+    config = from_args(SISConfig, None, argv)
+    assert config.lam == 0.05 and config.tau == 30
+
+    # Missing arguments print usage and quit
+    printed = []
+    with pytest.raises(SystemExit):
+        from_args(SEIRDConfig, lambda: printed.append(1), ['N=1000'])
+    assert printed == [1]
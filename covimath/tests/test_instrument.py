@@ -0,0 +1,46 @@
+from covimath.models import seird
+from covimath.models.batch import solve_model
+from covimath.utils import instrument
+import numpy as np
+import pytest
+
+def make_model():
+    return seird.SEIRD(N=1000, beta=1.38, sigma = 0.19, gamma=0.34, mu=0.03,
+                       E0=1, I0=1, R0=0, D0=0, tau=150)
+
+def test_stats():
+    model = make_model()
+    model.solve()
+    st = model.stats
+    
+    assert st.method == 'RK45' and st.status == 0 and st.label == 'SEIRD'
+    assert st.naccepted > 0 and st.nrejected >= 0
+    # RK45: 6 evaluations per step attempt, plus 2 to select the first step
+    assert st.nfev == 6 * (st.naccepted + st.nrejected) + 2
+    assert st.wall_time > 0
+    
+def test_implicit_method():
+    model = make_model()
+    model.solve(method='LSODA')
+    
+    assert model.stats.method == 'LSODA' and model.stats.nrejected is None
+    assert pytest.approx(125, 1) == model.peak()[1]
+    
+def test_hooks_and_aggregate():
+    seen = []
+    instrument.add_hook(seen.append)
+    try:
+        make_model().solve()
+        values = {'N': 1000, 'beta': np.linspace(1.0, 1.8, 10), 
+                  'sigma': 0.19, 'gamma': 0.34, 'mu': 0.03, 
+                  'E0': 1, 'I0': 1, 'R0': 0, 'D0': 0}
+        t, y, comps, stats = solve_model('SEIRD', values, 10, 150, chunk=4,
+                                         return_stats=True)
+    finally:
+        instrument.remove_hook(seen.append)
+    
+    assert len(seen) == 4 and len(stats) == 3
+    total = instrument.aggregate(stats)
+    assert total['count'] == 3 and total['size'] == 10
+    assert total['nfev'] == sum(s.nfev for s in stats)
+    assert total['failures'] == 0 and total['methods'] == ['RK45']
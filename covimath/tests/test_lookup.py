@@ -0,0 +1,62 @@
+from covimath.emulator import lookup
+from covimath.models import seird
+import numpy as np
+import pytest
+
+def small_table():
+    return lookup.build_table(ratio=np.linspace(3.5, 4.5, 6),
+                              sigma=np.linspace(0.4, 0.7, 4),
+                              mu=np.linspace(0.0, 0.15, 4), horizon=100.0)
+
+def test_lookup():
+    table = small_table()
+    res = table.lookup(N=1000, E0=1, I0=1, beta=1.38, sigma=0.19, 
+                       gamma=0.34, mu=0.03)
+    
+    model = seird.SEIRD(N=1000, beta=1.38, sigma = 0.19, gamma=0.34, 
+                        mu=0.03, E0=1, I0=1, R0=0, D0=0, tau=300)
+    model.solve()
+    day, infec = model.peak()
+    
+    assert pytest.approx(infec, rel=0.02) == res['peak_height']
+    assert abs(model.t[day] - res['peak_day']) < 1.5
+    assert pytest.approx(model.R[-1], rel=0.01) == res['final_R']
+    assert pytest.approx(model.D[-1], rel=0.02) == res['final_D']
+    
+def test_save_load(tmp_path):
+    table = small_table()
+    path = str(tmp_path / 'seird')
+    table.save(path)
+    loaded = lookup.load_table(path)
+    
+    assert isinstance(loaded.values, np.memmap)
+    beta = np.array([1.3, 1.4, 1.5])
+    a = table.lookup(N=1000, E0=1, I0=1, beta=beta, sigma=0.19, 
+                     gamma=0.34, mu=0.03)
+    b = loaded.lookup(N=1000, E0=1, I0=1, beta=beta, sigma=0.19, 
+                      gamma=0.34, mu=0.03)
+    assert b['peak_height'].shape == (3,)
+    assert b['peak_height'] == pytest.approx(a['peak_height'], rel=1e-6)
+    
+def test_population():
+    table = small_table()
+    res = table.lookup(N=100000, E0=100, I0=100, beta=1.38, sigma=0.19,
+                       gamma=0.34, mu=0.03)
+    
+    model = seird.SEIRD(N=100000, beta=1.38, sigma = 0.19, gamma=0.34, 
+                        mu=0.03, E0=100, I0=100, R0=0, D0=0, tau=300)
+    model.solve()
+    day, infec = model.peak()
+    
+    assert pytest.approx(infec, rel=0.02) == res['peak_height']
+    assert abs(model.t[day] - res['peak_day']) < 1.5
+    
+    # Initial fractions other than the table's are rejected
+    with pytest.raises(ValueError, match='E0/N'):
+        table.lookup(N=100000, E0=1, I0=1, beta=1.38, sigma=0.19, 
+                     gamma=0.34, mu=0.03)
+    
+def test_outside_table():
+    with pytest.raises(ValueError):
+        small_table().lookup(N=1000, E0=1, I0=1, beta=3.0, sigma=0.19, 
+                             gamma=0.34)
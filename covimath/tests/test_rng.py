@@ -0,0 +1,76 @@
+from covimath.utils import rng
+from covimath.sensitivity import sobol
+from covimath.emulator.surrogate import Emulator
+from covimath.paramest.assimilation import ParticleFilter
+import numpy as np
+import pytest
+
+bounds = {'beta': (1.0, 1.8), 'gamma': (0.2, 0.5)}
+fixed = {'N': 1000, 'sigma': 0.19, 'mu': 0.03,
+         'E0': 1, 'I0': 1, 'R0': 0, 'D0': 0}
+
+def draw(scale, gen):
+    return scale * gen.standard_normal(5)
+
+def test_map_streams():
+    r1 = rng.map_streams(draw, [1.0, 2.0, 3.0, 4.0], seed=7)
+    r3 = rng.map_streams(draw, [1.0, 2.0, 3.0, 4.0], seed=7, workers=3)
+    assert np.array_equal(np.array(r1), np.array(r3))
+    # Independent streams per item
+    assert not np.allclose(r1[0], r1[1] / 2.0)
+
+def test_describe():
+    ss = rng.seed_sequence(None)
+    meta = rng.describe(ss)
+    assert np.array_equal(rng.generator(ss).random(5),
+                          rng.generator(meta).random(5))
+    child = rng.spawn(meta, 2)[1]
+    assert np.array_equal(rng.generator(child).random(5),
+                          rng.generator(rng.describe(child)).random(5))
+    # Integer seeds give numpy's default_rng streams
+    assert np.array_equal(rng.generator(3).random(5),
+                          np.random.default_rng(3).random(5))
+
+def test_sobol_workers():
+    kwargs = dict(outputs=('peak_height', 'final_D'), n=32, nboot=20,
+                  chunk=16)
+    res1 = sobol.analyze('SEIRD', bounds, fixed, 100, seed=5, **kwargs)
+    res2 = sobol.analyze('SEIRD', bounds, fixed, 100, seed=5, workers=2,
+                         **kwargs)
+    res3 = sobol.analyze('SEIRD', bounds, fixed, 100,
+                         seed=res1['final_D']['seed'], **kwargs)
+    for o in kwargs['outputs']:
+        for k in ('S1', 'S1_conf', 'ST', 'ST_conf'):
+            assert np.array_equal(res1[o][k], res2[o][k], equal_nan=True)
+            assert np.array_equal(res1[o][k], res3[o][k], equal_nan=True)
+
+def test_reuse_seed_sequence():
+    ss = np.random.SeedSequence(11)
+    kwargs = dict(outputs=('final_D',), n=16, nboot=10)
+    res1 = sobol.analyze('SEIRD', bounds, fixed, 100, seed=ss, **kwargs)
+    res2 = sobol.analyze('SEIRD', bounds, fixed, 100, seed=ss, **kwargs)
+    res3 = sobol.analyze('SEIRD', bounds, fixed, 100,
+                         seed=res2['final_D']['seed'], **kwargs)
+    assert ss.n_children_spawned == 0
+    for k in ('S1', 'ST', 'ST_conf'):
+        assert np.array_equal(res1['final_D'][k], res2['final_D'][k],
+                              equal_nan=True)
+        assert np.array_equal(res2['final_D'][k], res3['final_D'][k],
+                              equal_nan=True)
+
+def test_emulator_workers():
+    emu1 = Emulator('SEIRD', bounds, fixed, 100, degree=2, nbasis=4)
+    emu1.train(n=32, chunk=8)
+    emu2 = Emulator('SEIRD', bounds, fixed, 100, degree=2, nbasis=4)
+    emu2.train(n=32, seed=emu1.seed, chunk=8, workers=2)
+    for o in emu1.outputs:
+        assert np.array_equal(emu1.coef[o], emu2.coef[o])
+
+def test_filter_replay():
+    args = ('SIR', 10000, {'beta': (0.5, 1.5), 'gamma': 0.34},
+            {'I0': (1, 20)})
+    pf1 = ParticleFilter(*args, particles=200)
+    pf2 = ParticleFilter(*args, particles=200, seed=pf1.seed)
+    for pf in (pf1, pf2):
+        pf.update([5, 8, 12, 15])
+    assert pf1.estimate() == pf2.estimate()
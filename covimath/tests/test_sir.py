@@ -1,4 +1,5 @@
 from covimath.models import sir
+import numpy as np
 import pytest
 
 def test_peak():
@@ -28,4 +29,45 @@ def test_method_seq2():
         I0 = 1
         R0 = 0
         model = sir.SIR(N=N, beta=0.2, gamma=0.1, I0=I0, R0=R0, tau=150)
-        model.plot()
\ No newline at end of file
+        model.plot()
+    
+def test_final_size():
+    model = sir.SIR(N=2000, beta=0.2, gamma=0.1, I0=1, R0=0, tau=300)
+    model.solve()
+    
+    assert pytest.approx(model.R[-1], rel=0.01) == model.final_size()
+    
+def test_peak_analytic():
+    model = sir.SIR(N=2000, beta=0.2, gamma=0.1, I0=1, R0=0, tau=150)
+    model.solve()
+    day, infec = model.peak()
+    
+    assert pytest.approx(infec, rel=0.01) == model.peak_height()
+    assert abs(model.t[day] - model.peak_time()) < 1.5
+    
+def test_analytic_vectorized():
+    beta = np.array([0.2, 0.3, 0.05])
+    size = sir.final_size(2000, beta, 0.1, 1, 0)
+    height = sir.peak_height(2000, beta, 0.1, 1, 0)
+    day = sir.peak_time(2000, beta, 0.1, 1, 0)
+    
+    assert size.shape == (3,) and height.shape == (3,) and day.shape == (3,)
+    for k in range(2):
+        model = sir.SIR(N=2000, beta=beta[k], gamma=0.1, I0=1, R0=0, tau=300)
+        model.solve()
+        assert pytest.approx(model.R[-1], rel=0.01) == size[k]
+        assert pytest.approx(model.peak()[1], rel=0.01) == height[k]
+    # No outbreak when beta < gamma: peak is the initial infection
+    assert height[2] == 1
+    assert day[2] == 0
+    
+def test_no_infection():
+    # Without initial infections the epidemic never starts
+    assert sir.final_size(1000, 0.3, 0.1, 0, 0) == 0
+    assert sir.final_size(1000, 0.3, 0.1, 0, 5) == 5
+    assert sir.peak_height(1000, 0.3, 0.1, 0, 0) == 0
+    assert sir.peak_time(1000, 0.3, 0.1, 0, 0) == 0
+    
+    model = sir.SIR(N=1000, beta=0.3, gamma=0.1, I0=0, R0=0, tau=150)
+    model.solve()
+    assert np.all(model.I == 0)
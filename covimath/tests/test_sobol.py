@@ -0,0 +1,29 @@
+from covimath.sensitivity import sobol
+import numpy as np
+import pytest
+
+def test_indices_linear():
+    # f = x1 + 2 * x2 on the unit square: S1 = ST = (0.2, 0.8)
+    A, B, AB = sobol.saltelli_sample({'x1': (0, 1), 'x2': (0, 1)}, 1024, 
+                                     seed=1)
+    f = lambda X: X[..., 0] + 2 * X[..., 1]
+    res = sobol.indices(f(A), f(B), f(AB), seed=1)
+    
+    assert res['S1'] == pytest.approx([0.2, 0.8], abs=0.02)
+    assert res['ST'] == pytest.approx([0.2, 0.8], abs=0.02)
+    assert np.all(res['ST_conf'] > 0)
+    
+def test_analyze_seird():
+    bounds = {'beta': (1.0, 1.8), 'sigma': (0.1, 0.3), 
+              'gamma': (0.2, 0.5), 'mu': (0.01, 0.05)}
+    fixed = {'N': 1000, 'E0': 1, 'I0': 1, 'R0': 0, 'D0': 0}
+    res = sobol.analyze('SEIRD', bounds, fixed, 150, 
+                        outputs=('peak_height', 'final_D'), n=256, seed=1)
+    
+    # Deaths are driven by mu and gamma, not by the incubation rate
+    ST = dict(zip(res['final_D']['names'], res['final_D']['ST']))
+    assert ST['mu'] > ST['sigma'] and ST['gamma'] > ST['sigma']
+    
+def test_missing_param():
+    with pytest.raises(ValueError):
+        sobol.analyze('SEIRD', {'beta': (1.0, 1.8)}, {'N': 1000}, 150, n=8)
@@ -0,0 +1,65 @@
+from covimath.models.batch import solve_model
+from covimath.utils import storage
+import numpy as np
+import pytest
+
+N = 1000
+values = {'N': N, 'beta': np.linspace(0.8, 1.6, 20), 'sigma': 0.19, 
+          'gamma': 0.34, 'mu': 0.03, 'E0': 1, 'I0': 1, 'R0': 0, 'D0': 0}
+
+def test_float32():
+    t, y, comps = solve_model('SEIRD', values, 20, 150)
+    ens = storage.compact(t, y, comps, N, mode='float32')
+    
+    assert ens.nbytes() * 2 == y.nbytes
+    err = ens.error(y)
+    assert max(err.values()) < 1e-6 * N
+    
+def test_counts():
+    t, y, comps = solve_model('SEIRD', values, 20, 150)
+    ens = storage.compact(t, y, comps, N, mode='counts')
+    
+    assert ens.data.dtype == np.uint16
+    assert ens.nbytes() * 4 == y.nbytes
+    err = ens.error(y)
+    assert max(err.values()) <= 0.5
+    
+def test_weekly():
+    t, y, comps = solve_model('SEIRD', values, 20, 150)
+    ens = storage.compact(t, y, comps, N, mode='counts', step=7)
+    
+    assert len(ens.t) == 22
+    assert np.array_equal(ens.t, t[::7])
+    assert max(ens.error(y, step=7).values()) <= 0.5
+    
+def test_solve_compact():
+    t, y, comps = solve_model('SEIRD', values, 20, 150, chunk=8)
+    ens = storage.solve_compact('SEIRD', values, 20, 150, mode='counts', 
+                                step=7, chunk=8)
+    
+    assert ens.data.shape == (5, 20, 22)
+    assert max(ens.error(y, step=7).values()) <= 0.5
+    
+    ens2, stats = storage.solve_compact('SEIRD', values, 20, 150, 
+                                        mode='counts', step=7, chunk=8,
+                                        return_stats=True)
+    assert np.array_equal(ens2.data, ens.data)
+    assert len(stats) == 3 and sum(s.size for s in stats) == 20
+    
+def test_save_load(tmp_path):
+    t, y, comps = solve_model('SEIRD', values, 20, 150)
+    ens = storage.compact(t, y, comps, N, mode='counts')
+    path = str(tmp_path / 'ensemble.npz')
+    ens.save(path, chunk=8)
+    
+    loaded = storage.load(path)
+    assert loaded.compartments == ('S', 'E', 'I', 'R', 'D')
+    assert loaded.mode == 'counts'
+    assert np.array_equal(loaded.data, ens.data)
+    
+    part = storage.load_chunk(path, 2)
+    assert np.array_equal(part.values('I'), ens.values('I')[16:])
+    
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        storage.compact([0], np.zeros((1, 1, 1)), ('S',), N, mode='int8')
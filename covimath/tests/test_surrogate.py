@@ -0,0 +1,44 @@
+from covimath.emulator.surrogate import Emulator
+from covimath.models import seird
+import numpy as np
+import pytest
+
+bounds = {'beta': (1.0, 1.8), 'sigma': (0.1, 0.3), 
+          'gamma': (0.2, 0.5), 'mu': (0.01, 0.05)}
+fixed = {'N': 1000, 'E0': 1, 'I0': 1, 'R0': 0, 'D0': 0}
+
+def test_predict():
+    emu = Emulator('SEIRD', bounds, fixed, 150)
+    emu.train(n=256, seed=1)
+    values, errors = emu.predict(beta=1.38, sigma=0.19, gamma=0.34, mu=0.03)
+    
+    model = seird.SEIRD(N=1000, beta=1.38, sigma = 0.19, gamma=0.34, 
+                        mu=0.03, E0=1, I0=1, R0=0, D0=0, tau=150)
+    model.solve()
+    day, infec = model.peak()
+    
+    assert abs(values['peak_height'][0] - infec) < 3 * errors['peak_height'][0] + 1
+    assert abs(values['peak_day'][0] - model.t[day]) < 3 * errors['peak_day'][0] + 1
+    assert pytest.approx(model.D[-1], rel=0.01) == values['final_D'][0]
+    
+    traj, terr = emu.trajectories(beta=1.38, sigma=0.19, gamma=0.34, mu=0.03)
+    assert traj['I'].shape == (1, 150)
+    assert np.sqrt(np.mean((traj['I'][0] - model.I) ** 2)) < 3 * terr['I'][0]
+    
+def test_fallback():
+    emu = Emulator('SEIRD', bounds, fixed, 150)
+    emu.train(n=64, seed=1)
+    values, errors = emu.predict(beta=[1.38, 2.5], sigma=0.19, gamma=0.34, 
+                                 mu=0.03)
+    
+    model = seird.SEIRD(N=1000, beta=2.5, sigma = 0.19, gamma=0.34, 
+                        mu=0.03, E0=1, I0=1, R0=0, D0=0, tau=150)
+    model.solve()
+    
+    assert errors['peak_height'][1] == 0
+    assert pytest.approx(model.peak()[1], rel=0.01) == values['peak_height'][1]
+    
+def test_method_seq():
+    with pytest.raises(ValueError):
+        emu = Emulator('SEIRD', bounds, fixed, 150)
+        emu.predict(beta=1.38, sigma=0.19, gamma=0.34, mu=0.03)
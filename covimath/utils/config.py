@@ -0,0 +1,166 @@
+import numpy as np
+import logging
+
+from .modelargs import parse_args
+
+logging.basicConfig(level = logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Typed configuration of a model: the arguments of its constructor.
+# Subclasses list their integer fields (INTS: population counts and the
+# time window) and real fields (REALS: rates), and the initial values
+# that, subtracted from N, give the initial susceptible population.
+# Rules: integers are non-negative (N and tau positive), rates are
+# positive, and the initial values add up to at most N.
+class ModelConfig:
+
+    __slots__ = ()
+    INTS = ()
+    REALS = ()
+    INITIAL = ()
+    ALIASES = {} # Command line name -> field name
+
+    def __init__(self, **kwargs):
+        miss = [f for f in self.INTS + self.REALS if f not in kwargs]
+        if len(miss) > 0:
+            raise ValueError('Some required arguments are missing: ' +
+                             ','.join(miss))
+        for f in self.INTS:
+            v = kwargs[f]
+            if int(v) != v:
+                raise ValueError('Argument ' + f + ' must be an integer.')
+            setattr(self, f, int(v))
+        for f in self.REALS:
+            setattr(self, f, float(kwargs[f]))
+        self.validate()
+
+    # Raise ValueError if the configuration breaks a rule
+    def validate(self):
+        errors = check(type(self), self.as_dict())
+        for msg, bad in errors:
+            if bad[0]:
+                raise ValueError(msg)
+
+    def as_dict(self):
+        return {f: getattr(self, f) for f in self.INTS + self.REALS}
+
+    def __repr__(self):
+        return type(self).__name__ + '(' + ', '.join(
+            f + '=' + repr(v) for f, v in self.as_dict().items()) + ')'
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.as_dict() == other.as_dict()
+
+class SISConfig(ModelConfig):
+    __slots__ = ('N', 'I0', 'tau', 'lam', 'mu', 'gamma')
+    INTS = ('N', 'I0', 'tau')
+    REALS = ('lam', 'mu', 'gamma')
+    INITIAL = ('I0',)
+    ALIASES = {'lambda': 'lam'}
+
+class SIRConfig(ModelConfig):
+    __slots__ = ('N', 'I0', 'R0', 'tau', 'beta', 'gamma')
+    INTS = ('N', 'I0', 'R0', 'tau')
+    REALS = ('beta', 'gamma')
+    INITIAL = ('I0', 'R0')
+
+class SEIRConfig(ModelConfig):
+    __slots__ = ('N', 'E0', 'I0', 'R0', 'tau', 'beta', 'sigma', 'gamma')
+    INTS = ('N', 'E0', 'I0', 'R0', 'tau')
+    REALS = ('beta', 'sigma', 'gamma')
+    INITIAL = ('E0', 'I0', 'R0')
+
+class SEIRDConfig(ModelConfig):
+    __slots__ = ('N', 'E0', 'I0', 'R0', 'D0', 'tau', 'beta', 'sigma',
+                 'gamma', 'mu')
+    INTS = ('N', 'E0', 'I0', 'R0', 'D0', 'tau')
+    REALS = ('beta', 'sigma', 'gamma', 'mu')
+    INITIAL = ('E0', 'I0', 'R0', 'D0')
+
+# Vectorized rule checks over a table of configurations (field -> scalar
+# or array, one entry per configuration). Returns a list of
+# (message, boolean array marking the configurations that break the rule).
+def check(cls, table):
+    miss = [f for f in cls.INTS + cls.REALS if f not in table]
+    if len(miss) > 0:
+        raise ValueError('Some required arguments are missing: ' +
+                         ','.join(miss))
+    cols = {f: np.atleast_1d(np.asarray(table[f], dtype=float))
+            for f in cls.INTS + cls.REALS}
+    errors = []
+    for f in cls.INTS:
+        v = cols[f]
+        errors.append(('Argument ' + f + ' must be an integer.',
+                       ~np.isfinite(v) | (v != np.round(v))))
+        if f in ('N', 'tau'):
+            errors.append(('Value for argument: ' + f +
+                           ' should be positive', ~(v > 0)))
+        else:
+            errors.append(('Value for argument: ' + f +
+                           ' should be non-negative', ~(v >= 0)))
+    for f in cls.REALS:
+        v = cols[f]
+        errors.append(('Value for argument: ' + f + ' should be positive',
+                       ~np.isfinite(v) | ~(v > 0)))
+    initial = sum(cols[f] for f in cls.INITIAL)
+    errors.append(('Initial values (' + ', '.join(cls.INITIAL) +
+                   ') add up to more than N', initial > cols['N']))
+    n = max(len(v) for v in cols.values())
+    return [(msg, np.broadcast_to(bad, (n,))) for msg, bad in errors]
+
+# Boolean array marking the valid configurations in a table (see check())
+def validate_batch(cls, table):
+    errors = check(cls, table)
+    valid = ~np.any([bad for msg, bad in errors], axis=0)
+    if not np.all(valid):
+        for msg, bad in errors:
+            if np.any(bad):
+                logger.warning('%d configurations rejected: %s',
+                               np.sum(bad), msg)
+    return valid
+
+# Configurations of the valid rows of a table (see check()). The rows are
+# checked together, then the objects are filled without further checks.
+def from_table(cls, table):
+    valid = validate_batch(cls, table)
+    fields = cls.INTS + cls.REALS
+    cols = {f: np.broadcast_to(np.asarray(table[f]), valid.shape)[valid]
+            for f in fields}
+    configs = []
+    for k in range(int(np.sum(valid))):
+        c = cls.__new__(cls)
+        for f in cls.INTS:
+            setattr(c, f, int(cols[f][k]))
+        for f in cls.REALS:
+            setattr(c, f, float(cols[f][k]))
+        configs.append(c)
+    return configs
+
+# Configuration of a model from the command line (default: sys.argv).
+# Prints usage and quits on missing or invalid arguments.
+def from_args(cls, usage, argv=None):
+    ints = tuple(a for a, f in cls.ALIASES.items() if f in cls.INTS)
+    reals = tuple(a for a, f in cls.ALIASES.items() if f in cls.REALS)
+    try:
+        res = parse_args(argv, ints=cls.INTS + ints, reals=cls.REALS + reals)
+    except ValueError as e:
+        logger.error(str(e))
+        usage()
+        quit()
+
+    if res is None:
+        logger.error('No argument passed.')
+        usage()
+        quit()
+
+    if res == 'usage':
+        usage()
+        quit()
+
+    args = {cls.ALIASES.get(k, k): v for k, v in res.items()}
+    try:
+        return cls(**args)
+    except ValueError as e:
+        logger.error(str(e))
+        usage()
+        quit()
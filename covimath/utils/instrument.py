@@ -0,0 +1,125 @@
+import time
+import logging
+from scipy.integrate import solve_ivp, RK23, RK45, DOP853, Radau, BDF, LSODA
+
+logging.basicConfig(level = logging.INFO)
+logger = logging.getLogger(__name__)
+
+METHODS = {'RK23': RK23, 'RK45': RK45, 'DOP853': DOP853,
+           'Radau': Radau, 'BDF': BDF, 'LSODA': LSODA}
+
+# Callbacks invoked with the SolveStats of every solve (e.g. to export them
+# to a metrics system). Managed with add_hook() / remove_hook().
+_hooks = []
+
+def add_hook(hook):
+    _hooks.append(hook)
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+# Statistics of one call to solve_ivp
+class SolveStats:
+
+    def __init__(self, method, wall_time, nfev, njev, nlu, naccepted,
+                 nrejected, status, message, size=1, label=None):
+        self.method = method # Name of the solver method
+        self.wall_time = wall_time # Seconds spent in solve_ivp
+        self.nfev = nfev # Number of right hand side evaluations
+        self.njev = njev # Number of Jacobian evaluations
+        self.nlu = nlu # Number of LU decompositions
+        self.naccepted = naccepted # Number of accepted steps
+        # Number of rejected steps (None for implicit methods and LSODA,
+        # whose function evaluations are not tied to step attempts)
+        self.nrejected = nrejected
+        self.status = status # solve_ivp status: 0 success, -1 failure
+        self.message = message
+        self.size = size # Number of model instances solved together
+        self.label = label # Name of the model solved
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def __repr__(self):
+        return 'SolveStats(' + ', '.join(k + '=' + repr(v) for k, v in
+                                         vars(self).items()) + ')'
+
+# Totals over a collection of SolveStats, e.g. the chunks of a batch
+def aggregate(stats):
+    stats = list(stats)
+    rejected = [s.nrejected for s in stats]
+    return {
+        'count': len(stats),
+        'size': sum(s.size for s in stats),
+        'wall_time': sum(s.wall_time for s in stats),
+        'wall_time_max': max([s.wall_time for s in stats], default=0.0),
+        'nfev': sum(s.nfev for s in stats),
+        'njev': sum(s.njev for s in stats),
+        'nlu': sum(s.nlu for s in stats),
+        'naccepted': sum(s.naccepted for s in stats),
+        'nrejected': None if None in rejected else sum(rejected),
+        'failures': sum(1 for s in stats if s.status < 0),
+        'methods': sorted(set(s.method for s in stats)),
+    }
+
+# Solver classes counting accepted and rejected steps. Each call of
+# _step_impl() makes one accepted step (or fails); for explicit Runge-Kutta
+# methods every attempt costs n_stages function evaluations, which gives the
+# number of rejected attempts.
+_counting = {}
+
+def _counting_class(base):
+    if base in _counting:
+        return _counting[base]
+
+    class Counting(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.naccepted = 0
+            self.nrejected = 0 if hasattr(self, 'n_stages') else None
+
+        def _step_impl(self):
+            nfev = self.nfev
+            success, message = super()._step_impl()
+            if success:
+                self.naccepted += 1
+            if self.nrejected is not None:
+                attempts = (self.nfev - nfev) // self.n_stages
+                self.nrejected += max(attempts - (1 if success else 0), 0)
+            return success, message
+
+    Counting.__name__ = base.__name__
+    _counting[base] = Counting
+    return Counting
+
+# Drop-in replacement for solve_ivp that also returns a SolveStats.
+# Hooks are called unless notify is False (the caller then reports the
+# stats itself, e.g. after collecting them from worker processes).
+def solve(fun, t_span, y0, method='RK45', label=None, size=1, notify=True,
+          **kwargs):
+    if method not in METHODS:
+        raise ValueError('Unknown solver method: ' + str(method))
+    solvers = []
+
+    class Solver(_counting_class(METHODS[method])):
+        def __init__(self, *args, **kw):
+            super().__init__(*args, **kw)
+            solvers.append(self)
+
+    start = time.perf_counter()
+    sol = solve_ivp(fun, t_span, y0, method=Solver, **kwargs)
+    wall = time.perf_counter() - start
+
+    solver = solvers[0]
+    stats = SolveStats(method, wall, int(sol.nfev), int(sol.njev),
+                       int(sol.nlu), solver.naccepted, solver.nrejected, sol.status,
+                       sol.message, size=size, label=label)
+    logger.debug('Solved %s: %s', label, stats)
+    if notify:
+        report(stats)
+    return sol, stats
+
+# Pass stats to every registered hook
+def report(stats):
+    for hook in list(_hooks):
+        hook(stats)
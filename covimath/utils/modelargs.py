@@ -4,22 +4,26 @@ import logging
 logging.basicConfig(level = logging.INFO)
 logger = logging.getLogger(__name__)
 
-def parse_args():
-    nargs = len(sys.argv)
-    if nargs == 1:
+# Coercion of the arguments of all models (see config.py for each model's)
+INTS = ('N', 'E0', 'I0', 'R0', 'D0', 'tau')
+REALS = ('lambda', 'beta', 'gamma', 'sigma', 'mu')
+
+# Parse arguments of the form name=value (default: sys.argv[1:]). Values
+# of names in ints/reals are coerced and checked (integers non-negative,
+# reals positive); other values are kept as strings, and bare flags map to
+# None.
+def parse_args(argv=None, ints=INTS, reals=REALS):
+    args = sys.argv[1:] if argv is None else list(argv)
+    if len(args) == 0:
         logger.info('No arguments supplied.')
         return None
     
-    args = sys.argv[1:]
-    
     firstarg = args[0].strip().lower()
     if firstarg in ['-h', '--help']:
         logger.info('Command help requested.')
         return 'usage'
     
     argdict = {}
-    ints = ['N', 'E0', 'I0', 'R0', 'D0', 'tau'] 
-    reals = ['lambda', 'beta', 'gamma', 'sigma', 'mu']
     
     for a in args:
         tokens = a.split('=')
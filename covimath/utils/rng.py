@@ -0,0 +1,65 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import logging
+
+logging.basicConfig(level = logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Random streams of covimath. Every randomized feature takes a seed, which
+# may be:
+# - None: fresh entropy from the operating system (the seed actually used
+#   is still recorded, see describe())
+# - an integer
+# - a numpy.random.SeedSequence
+# - the dict returned by describe(), to replay a recorded run
+# Independent streams for parts of a computation (e.g. scenarios, outputs,
+# tasks) are spawned from the seed, one per part and in a fixed order, so
+# that results do not depend on how the parts are spread over workers.
+
+# SeedSequence of a seed (see above). A SeedSequence is copied without its
+# spawn history, so spawning from the result leaves the caller's untouched
+# and the same seed always spawns the same children.
+def seed_sequence(seed=None):
+    if isinstance(seed, np.random.SeedSequence):
+        return np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key,
+                                      pool_size=seed.pool_size)
+    if isinstance(seed, dict):
+        return np.random.SeedSequence(seed['entropy'],
+                                      spawn_key=tuple(seed['spawn_key']))
+    return np.random.SeedSequence(seed)
+
+# Random generator of a seed
+def generator(seed=None):
+    return np.random.Generator(np.random.PCG64(seed_sequence(seed)))
+
+# n independent child SeedSequences of a seed
+def spawn(seed, n):
+    return seed_sequence(seed).spawn(n)
+
+# n independent random generators from a seed
+def streams(seed, n):
+    return [generator(s) for s in spawn(seed, n)]
+
+# Record of a seed, for the metadata of results; generator(describe(seed))
+# reproduces the stream of seed
+def describe(seed):
+    ss = seed_sequence(seed)
+    return {'entropy': ss.entropy, 'spawn_key': list(ss.spawn_key)}
+
+def _call(fn, item, seed):
+    return fn(item, generator(seed))
+
+# Apply fn(item, rng) to every item, over workers processes if workers > 1
+# (fn must then be picklable, e.g. a module-level function). Item k gets
+# the k-th stream spawned from seed, so the results are the same for any
+# number of workers.
+def map_streams(fn, items, seed=None, workers=1):
+    items = list(items)
+    seeds = spawn(seed, len(items))
+    if workers <= 1 or len(items) <= 1:
+        return [_call(fn, item, s) for item, s in zip(items, seeds)]
+
+    logger.info('Running %d random tasks over %d processes ...',
+                len(items), workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_call, [fn] * len(items), items, seeds))
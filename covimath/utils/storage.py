@@ -0,0 +1,113 @@
+from functools import partial
+import numpy as np
+import logging
+
+from ..models.batch import solve_model
+
+logging.basicConfig(level = logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Storage modes:
+# 'float64': values as solved
+# 'float32': single precision (relative error about 6e-8)
+# 'counts': numbers of people rounded to integers (error at most 0.5), in
+#   the smallest unsigned integer type that holds N
+MODES = ('float64', 'float32', 'counts')
+
+# Members per compressed chunk on disk
+CHUNK = 1024
+
+def _count_dtype(N):
+    for dt in (np.uint8, np.uint16, np.uint32):
+        if N <= np.iinfo(dt).max:
+            return dt
+    return np.uint64
+
+# Compact store of ensemble trajectories, e.g. from batch.solve_model().
+# data has shape (ncomp, n, len(t)) in the dtype of the storage mode.
+class CompactEnsemble:
+
+    def __init__(self, t, data, compartments, mode):
+        self.t = t # Stored time points
+        self.data = data
+        self.compartments = tuple(compartments)
+        self.mode = mode
+
+    # Trajectories as float64: all compartments (shape (ncomp, n, len(t)))
+    # or a single one (shape (n, len(t)))
+    def values(self, comp=None):
+        if comp is None:
+            return self.data.astype(np.float64)
+        return self.data[self.compartments.index(comp)].astype(np.float64)
+
+    # Bytes used by the trajectories
+    def nbytes(self):
+        return self.data.nbytes
+
+    # Largest absolute difference from full trajectories y (shape
+    # (ncomp, n, len(tfull))) at the stored time points, per compartment
+    def error(self, y, step=1):
+        ref = np.asarray(y)[..., ::step]
+        diff = np.abs(self.values() - ref)
+        return dict(zip(self.compartments, diff.max(axis=(1, 2))))
+
+    # Write to path (a .npz file) with each chunk of members compressed
+    # separately, so that load_chunk() reads only what it needs
+    def save(self, path, chunk=CHUNK):
+        n = self.data.shape[1]
+        arrays = {'t': self.t, 'compartments': np.array(self.compartments),
+                  'mode': np.array(self.mode), 'chunk': np.array(chunk),
+                  'n': np.array(n)}
+        for k, lo in enumerate(range(0, n, chunk)):
+            arrays['data_%05d' % k] = self.data[:, lo:lo + chunk]
+        logger.info('Saving %d trajectories to %s ...', n, path)
+        np.savez_compressed(path, **arrays)
+
+# Trajectories y in the dtype of the storage mode, every step-th time point
+def _convert(y, N, mode, step):
+    y = np.asarray(y)[..., ::step]
+    if mode == 'counts':
+        return np.clip(np.rint(y), 0, N).astype(_count_dtype(N))
+    return y.astype(mode)
+
+# Compact trajectories y (shape (ncomp, n, len(t))) of an ensemble.
+# N: total population (scalar or one per member), bounds the counts.
+# step: keep every step-th time point (e.g. 7 for weekly points from
+#   daily ones).
+def compact(t, y, compartments, N, mode='float32', step=1):
+    if mode not in MODES:
+        raise ValueError('Unknown storage mode: ' + str(mode))
+    data = _convert(y, np.max(N), mode, step)
+    return CompactEnsemble(np.asarray(t)[::step], data, compartments, mode)
+
+# Solve an ensemble (see batch.solve_model()) and store it compactly. Each
+# chunk is converted as soon as it is solved, so the full float64
+# trajectories of the ensemble are never held in memory at once.
+# Returns the CompactEnsemble, plus the chunk SolveStats if return_stats is
+# True.
+def solve_compact(model, values, n, tau, mode='float32', step=1,
+                  return_stats=False, **kwargs):
+    if mode not in MODES:
+        raise ValueError('Unknown storage mode: ' + str(mode))
+    N = float(np.max(values['N']))
+    res = solve_model(model, values, n, tau, return_stats=return_stats,
+                      transform=partial(_convert, N=N, mode=mode, step=step),
+                      **kwargs)
+    ens = CompactEnsemble(res[0][::step], res[1], res[2], mode)
+    if return_stats:
+        return ens, res[3]
+    return ens
+
+# Load an ensemble written by CompactEnsemble.save()
+def load(path):
+    with np.load(path) as f:
+        keys = sorted(k for k in f.files if k.startswith('data_'))
+        data = np.concatenate([f[k] for k in keys], axis=1)
+        return CompactEnsemble(f['t'], data, f['compartments'].tolist(),
+                               str(f['mode']))
+
+# Load only the k-th chunk of members of a saved ensemble
+def load_chunk(path, k):
+    with np.load(path) as f:
+        return CompactEnsemble(f['t'], f['data_%05d' % k],
+                               f['compartments'].tolist(), str(f['mode']))